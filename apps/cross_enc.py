@@ -5,15 +5,25 @@
 #  \____|_|  \___/|___/___/ |_____|_| \_|\____|
 #
 
+import os
 import time
 import modal
+import numpy
 import typing
+import asyncio
+import hashlib
 from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
 from sentence_transformers import CrossEncoder
+from services.infrastructure.batch.length_bucket import bucket_by_tokens
+from services.infrastructure.cache.redis_cache import RedisCache
+from services.infrastructure.cache.tiered_cache import TieredCache
 from images.embed_image import (
     image, secrets
 )
-from utils import toolset
+from utils import (
+    const, toolset
+)
 
 # Notes: https://huggingface.co/cross-encoder
 # ms-marco-MiniLM-L-12-v2
@@ -31,22 +41,106 @@ toolset.init_logger()
     max_containers=5,
     scaledown_window=300
 )
+@modal.concurrent(max_inputs=const.RERANK_MAX_INPUTS)
 class CrossENC(object):
 
     reranker: typing.Optional[CrossEncoder] = None
+    executor: typing.Optional[ThreadPoolExecutor] = None
+    pending: int = 0
+    cache: typing.Optional[TieredCache] = None
 
     @modal.enter()
     def startup(self) -> None:
         logger.info("🔥 CrossEncoder model loading ...")
         self.reranker = CrossEncoder(src)
+        self.executor = ThreadPoolExecutor(
+            max_workers=const.RERANK_WORKERS, thread_name_prefix="rerank"
+        )
+        self.cache = TieredCache(
+            "rerank",
+            const.RERANK_CACHE_SIZE,
+            RedisCache(
+                os.environ["REDIS_URL"], os.environ["REDIS_KEY"]
+            ) if os.environ.get("REDIS_URL") else None,
+            const.RERANK_CACHE_TTL,
+            dumps=lambda score: numpy.float32(score).tobytes(),
+            loads=lambda raw: float(numpy.frombuffer(raw, dtype="float32")[0])
+        )
         logger.info("🔥 CrossEncoder model loaded")
 
+    @modal.exit()
+    def shutdown(self) -> None:
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _queue_stats(self) -> dict[str, int]:
+        return {
+            "pending" : self.pending,
+            "running" : min(self.pending, const.RERANK_WORKERS),
+            "waiting" : max(self.pending - const.RERANK_WORKERS, 0)
+        }
+
+    async def _predict_async(self, pairs: list[list[str]]) -> numpy.ndarray:
+        """
+        推理放到专用线程池执行，事件循环不被阻塞，心跳与其它输入照常响应。
+        """
+
+        self.pending += 1
+        logger.info(f"   └ queue | {self._queue_stats()}")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._predict, pairs
+            )
+        finally:
+            self.pending -= 1
+
+    def _predict(self, pairs: list[list[str]]) -> numpy.ndarray:
+        if not pairs:
+            return numpy.empty(0, dtype="float32")
+
+        # 按 pair 的 token 长度排序分桶，以 token 预算代替固定 batch_size，减少 padding
+        lengths = [
+            len(ids) for ids in self.reranker.tokenizer(
+                [q for q, _ in pairs], [c for _, c in pairs],
+                truncation=True, max_length=self.reranker.max_length
+            )["input_ids"]
+        ]
+
+        scores = numpy.empty(len(pairs), dtype="float32")
+        for bucket in bucket_by_tokens(lengths, const.RERANK_TOKEN_BUDGET, const.RERANK_MAX_BATCH):
+            scores[bucket] = self.reranker.predict(
+                [pairs[i] for i in bucket], batch_size=len(bucket)
+            )
+
+        return scores
+
+    @staticmethod
+    def _cache_key(query: str, candidate: str) -> str:
+        digest = hashlib.sha1(
+            f"ms-marco-MiniLM-L-12-v2\x00{query}\x00{candidate}".encode()
+        ).hexdigest()
+        return f"rrk:{digest}"
+
+    async def _score(self, pairs: list[list[str]]) -> numpy.ndarray:
+        """
+        经两级缓存取 pair 得分，只把未命中的 pair 送入模型。
+        """
+
+        keys = [self._cache_key(q, c) for q, c in pairs]
+        todo = dict(zip(keys, pairs))
+
+        async def compute(missed: list[str]) -> list[float]:
+            return [float(v) for v in await self._predict_async([todo[k] for k in missed])]
+
+        return numpy.array(await self.cache.fetch(keys, compute), dtype="float32")
+
     @modal.method()
     async def heartbeat(self) -> dict:
         return {
             "status"  : "ok",
             "service" : "rerank",
-            "model"   : "ms-marco-MiniLM-L-12-v2"
+            "model"   : "ms-marco-MiniLM-L-12-v2",
+            "queue"   : self._queue_stats()
         }
 
     @modal.method()
@@ -69,7 +163,7 @@ class CrossENC(object):
 
             # ===== 2) 推理 =====
             logger.info("🟡 2/3) CrossEncoder 推理中...")
-            rerank_scores = self.reranker.predict(pairs)
+            rerank_scores = await self._score(pairs)
 
             scores = [float(s) for s in rerank_scores]
 
@@ -91,6 +185,67 @@ class CrossENC(object):
             logger.exception("❌ [ERROR] Rerank failed")
             raise e
 
+    @modal.method()
+    async def rerank_batch(
+        self,
+        groups: list[dict[str, typing.Any]],
+        k: typing.Optional[int] = None
+    ) -> dict:
+        """
+        多组 (query, candidate) 的所有 pair 拉平后一次推理，再按组切回。
+        """
+
+        start_ts = time.time()
+
+        logger.info(f"🟡 [BEGIN] Rerank batch start")
+        logger.info(
+            f"🟢 Group count={len(groups)} | pair count={sum(len(g['candidate']) for g in groups)}"
+        )
+
+        try:
+            # ===== 1) 构造 pair =====
+            logger.info("🟢 1/3) 拉平所有组的 query-candidate pairs")
+            pairs = [[g["query"], t] for g in groups for t in g["candidate"]]
+
+            # ===== 2) 推理 =====
+            logger.info("🟡 2/3) CrossEncoder 推理中...")
+            rerank_scores = await self._score(pairs)
+
+            # ===== 3) 按组切回 =====
+            logger.info(f"🟢 3/3) 按组切分结果 | k={k}")
+            results, offset = [], 0
+            for g in groups:
+                chunk   = rerank_scores[offset: offset + len(g["candidate"])]
+                offset += len(g["candidate"])
+
+                top = None
+                if k:
+                    n     = min(k, len(chunk))
+                    index = numpy.argpartition(-chunk, n - 1)[:n]
+                    index = index[numpy.argsort(-chunk[index])]
+                    top   = [
+                        {"index": int(i), "score": float(chunk[i]), "text": g["candidate"][i]} for i in index
+                    ]
+
+                results.append({
+                    "scores" : chunk.tolist(),
+                    "count"  : len(chunk),
+                    "top"    : top
+                })
+
+            logger.info(
+                f"✅ [FINAL] Rerank batch finished | count={len(pairs)} | elapsed={time.time() - start_ts:.3f}s"
+            )
+
+            return {
+                "groups": results,
+                "count": len(pairs)
+            }
+
+        except Exception as e:
+            logger.exception("❌ [ERROR] Rerank batch failed")
+            raise e
+
 
 if __name__ == '__main__':
     pass
@@ -6,17 +6,28 @@
 #                                                 |___/
 #
 
+import io
+import os
 import time
 import modal
 import numpy
+import torch
 import typing
 import asyncio
+import hashlib
+import unicodedata
 from loguru import logger
 from sentence_transformers import SentenceTransformer
+from services.infrastructure.batch.micro_batch import MicroBatcher
+from services.infrastructure.batch.length_bucket import bucket_by_tokens
+from services.infrastructure.cache.redis_cache import RedisCache
+from services.infrastructure.cache.tiered_cache import TieredCache
 from images.embed_image import (
     image, secrets
 )
-from utils import toolset
+from utils import (
+    const, toolset
+)
 
 # Notes: https://huggingface.co/collections/BAAI/bge
 # BAAI/bge-m3
@@ -24,27 +35,122 @@ from utils import toolset
 app = modal.App("embedding")
 src = "/root/models/bge_m3"
 
+# Notes: 按部署选择推理精度，fp32 / fp16 / bf16 走 GPU，int8 / onnx 走 CPU 容器
+precision = os.environ.get("EMBED_PRECISION", const.PRECISION_FP32)
+
 toolset.init_logger()
 
 
 @app.cls(
     image=image,
-    secrets=secrets,
-    gpu="A10G",
+    secrets=secrets + [modal.Secret.from_dict({"EMBED_PRECISION": precision})],
+    gpu="A10G" if precision in const.PRECISION_GPU else None,
     memory=16384,
     max_containers=5,
     scaledown_window=300
 )
+@modal.concurrent(max_inputs=const.EMBED_MAX_INPUTS)
 class Embedding(object):
 
     embedder: typing.Optional[SentenceTransformer] = None
+    batcher: typing.Optional[MicroBatcher] = None
+    cache: typing.Optional[TieredCache] = None
 
     @modal.enter()
     def startup(self) -> None:
-        logger.info("🔥 BGE embedding model loading ...")
-        self.embedder = SentenceTransformer(src)
+        logger.info(f"🔥 BGE embedding model loading ... | precision={precision}")
+        self.embedder = self._load_embedder(precision)
+        self.batcher  = MicroBatcher(
+            self._encode, const.EMBED_MAX_WAIT, const.EMBED_MAX_TOKENS
+        )
+        self.cache = TieredCache(
+            "embedding",
+            const.EMBED_CACHE_SIZE,
+            RedisCache(
+                os.environ["REDIS_URL"], os.environ["REDIS_KEY"]
+            ) if os.environ.get("REDIS_URL") else None,
+            const.EMBED_CACHE_TTL,
+            dumps=lambda vec: vec.tobytes(),
+            loads=lambda raw: numpy.frombuffer(raw, dtype="float32")
+        )
         logger.info("🔥 BGE embedding model loaded")
 
+    @staticmethod
+    def _load_embedder(mode: str) -> SentenceTransformer:
+        match mode:
+            case const.PRECISION_FP16:
+                return SentenceTransformer(src, device="cuda", model_kwargs={"torch_dtype": torch.float16})
+            case const.PRECISION_BF16:
+                return SentenceTransformer(src, device="cuda", model_kwargs={"torch_dtype": torch.bfloat16})
+            case const.PRECISION_INT8:
+                # 动态量化只替换 Linear 层权重为 int8，激活仍按 fp32 计算
+                return torch.ao.quantization.quantize_dynamic(
+                    SentenceTransformer(src, device="cpu"), {torch.nn.Linear}, dtype=torch.qint8
+                )
+            case const.PRECISION_ONNX:
+                return SentenceTransformer(src, device="cpu", backend="onnx")
+            case const.PRECISION_FP32:
+                return SentenceTransformer(src)
+            case _:
+                raise ValueError(f"Unsupported embedding precision: {mode}")
+
+    def _encode(
+        self,
+        texts: list[str],
+        embedder: typing.Optional[SentenceTransformer] = None
+    ) -> numpy.ndarray:
+        embedder = embedder or self.embedder
+        if not texts:
+            return numpy.empty((0, embedder.get_sentence_embedding_dimension()), dtype="float32")
+
+        # 按 token 长度排序分桶，以 token 预算代替固定 batch_size，减少 padding
+        lengths = [
+            len(ids) for ids in embedder.tokenizer(
+                texts, truncation=True, max_length=embedder.max_seq_length
+            )["input_ids"]
+        ]
+
+        embeds = numpy.empty(
+            (len(texts), embedder.get_sentence_embedding_dimension()), dtype="float32"
+        )
+        for bucket in bucket_by_tokens(lengths, const.EMBED_TOKEN_BUDGET, const.EMBED_MAX_BATCH):
+            embeds[bucket] = embedder.encode(
+                [texts[i] for i in bucket], batch_size=len(bucket), convert_to_numpy=True
+            )
+
+        return embeds
+
+    @staticmethod
+    def _cache_key(text: str) -> str:
+        normal = unicodedata.normalize("NFKC", text).strip()
+        # 不同精度模式产出的向量不同，共享 Redis 时按精度隔离
+        digest = hashlib.sha1(f"BAAI/bge-m3\x00{precision}\x00{normal}".encode()).hexdigest()
+        return f"emb:{digest}"
+
+    async def _embed(self, mesh: list[str]) -> numpy.ndarray:
+        """
+        经两级缓存取向量，只把未命中的文本送入微批合并。
+        """
+
+        keys  = [self._cache_key(t) for t in mesh]
+        texts = dict(zip(keys, mesh))
+
+        async def compute(missed: list[str]) -> list[numpy.ndarray]:
+            embeds = numpy.asarray(
+                await self.batcher.submit([texts[k] for k in missed]), dtype="float32"
+            )
+            # 微批结果是整批合并矩阵的切片，逐行复制后再进缓存，避免单个向量拖住整批内存
+            return [row.copy() for row in embeds]
+
+        return numpy.stack(await self.cache.fetch(keys, compute))
+
+    @staticmethod
+    def _top_k(scores: numpy.ndarray, elements: list[str], k: int) -> list[dict[str, str | float]]:
+        k   = min(k, len(scores))
+        top = numpy.argpartition(-scores, k - 1)[:k]
+        top = top[numpy.argsort(-scores[top])]
+        return [{"score": float(scores[i]), "text": elements[i]} for i in top]
+
     @modal.method()
     async def heartbeat(self) -> dict:
         return {
@@ -53,6 +159,47 @@ class Embedding(object):
             "model"   : "BAAI/bge-m3"
         }
 
+    @modal.method()
+    async def benchmark(self, texts: list[str]) -> dict:
+        """
+        以同设备 fp32 模型为基准，对比当前精度模式的向量余弦一致性与吞吐。
+        """
+
+        logger.info(f"🟡 [BEGIN] Embedding benchmark | precision={precision} | texts={len(texts)}")
+
+        # 加载基准模型与两次编码都在线程中执行，不阻塞并发的 tensor 调用与微批合并
+        resp = await asyncio.to_thread(self._benchmark, texts)
+
+        logger.info(f"✅ [FINAL] Embedding benchmark finished | {resp}")
+        return resp
+
+    def _benchmark(self, texts: list[str]) -> dict:
+        t1 = time.time()
+        current = self._encode(texts)
+        current_cost = time.time() - t1
+
+        reference = SentenceTransformer(
+            src, device="cpu" if precision in const.PRECISION_CPU else None
+        )
+        t2 = time.time()
+        baseline = self._encode(texts, reference)
+        baseline_cost = time.time() - t2
+        del reference
+
+        current  = current / (numpy.linalg.norm(current, axis=1, keepdims=True) + 1e-8)
+        baseline = baseline / (numpy.linalg.norm(baseline, axis=1, keepdims=True) + 1e-8)
+        cosine   = numpy.sum(current * baseline, axis=1)
+
+        return {
+            "precision"     : precision,
+            "count"         : len(texts),
+            "cosine_mean"   : float(cosine.mean()) if len(texts) else None,
+            "cosine_min"    : float(cosine.min()) if len(texts) else None,
+            "current_cost"  : round(current_cost, 4),
+            "baseline_cost" : round(baseline_cost, 4),
+            "speedup"       : round(baseline_cost / current_cost, 3) if current_cost else None
+        }
+
     @modal.method()
     async def tensor(
         self,
@@ -60,7 +207,12 @@ class Embedding(object):
         elements: list[str],
         mesh: list[str],
         s: bool = False,
-        k: typing.Optional[int] = 5
+        k: typing.Optional[int] = 5,
+        fmt: typing.Optional[str] = None,
+        queries: typing.Optional[list[str]] = None,
+        scores_only: bool = False,
+        dim: typing.Optional[int] = None,
+        dtype: str = "float32"
     ) -> dict:
 
         start_ts = time.time()
@@ -72,16 +224,17 @@ class Embedding(object):
             # ===== 1) 调用嵌入 =====
             t1 = time.time()
             logger.info(
-                f"🟢 1/5) 调用 SentenceTransformer.encode()"
-            )
-            embeds = await asyncio.to_thread(
-                self.embedder.encode, mesh, batch_size=16, convert_to_numpy=True
+                f"🟢 1/5) 调用 SentenceTransformer.encode()（缓存 + 微批合并）"
             )
+            embeds = await self._embed(mesh)
             logger.info(f"   └ done | shape={embeds.shape} | cost={time.time() - t1:.3f}s")
 
             # ===== 2) 归一化 =====
             t2 = time.time()
-            logger.info(f"🟢 2/5) 向量归一化（L2）")
+            logger.info(f"🟢 2/5) 向量归一化（L2）| dim={dim or embeds.shape[-1]}")
+            # Matryoshka 截断：先取前 dim 维再归一化，打分与返回都基于截断向量
+            if dim and dim < embeds.shape[-1]:
+                embeds = embeds[:, :dim]
             embeds = embeds / (numpy.linalg.norm(embeds, axis=1, keepdims=True) + 1e-8)
             logger.info(f"   └ done | cost={time.time() - t2:.3f}s")
 
@@ -90,32 +243,34 @@ class Embedding(object):
             embeds = numpy.asarray(embeds, dtype="float32")
 
             # ===== 4) 拆分结构 =====
-            logger.info("🟢 4/5) 拆分 query / page vectors")
+            logger.info("🟢 4/5) 拆分 query / queries / page vectors")
+            queries = queries or []
+
+            q_rows       = 1 if query else 0
             query_vec    = embeds[0] if query else numpy.array([], dtype="float32")
-            page_vectors = embeds[1:] if elements else numpy.array([], dtype="float32")
+            batch_vecs   = embeds[q_rows: q_rows + len(queries)]
+            page_vectors = embeds[q_rows + len(queries):] if elements else numpy.array([], dtype="float32")
 
             scored: typing.Optional[list[dict[str, str | float]]] = None
-            if s:
+            batch_scored: typing.Optional[list[list[dict[str, str | float]]]] = None
+            if s and elements and (query or queries):
                 t_2 = time.time()
                 logger.info(
-                    f"🟡 Score enabled | mode=cosine | elements={len(elements)} | k={k or 5}"
+                    f"🟡 Score enabled | mode=cosine | queries={q_rows + len(queries)} | elements={len(elements)} | k={k or 5}"
                 )
-                scores = (page_vectors @ query_vec).tolist()
-                scored = [
-                    {
-                        "score" : float(scores[i]),
-                        "text"  : elements[i]
-                    }
-                    for i in range(len(elements))
-                ]
-                scored.sort(key=lambda x: x["score"], reverse=True)
-                scored = scored[:k or 5]
+                # 所有 query 与 elements 一次矩阵乘法打分
+                score_matrix = numpy.vstack(
+                    ([query_vec] if query else []) + ([batch_vecs] if queries else [])
+                ) @ page_vectors.T
 
-                v = [x["score"] for x in scored]
-                logger.info(
-                    f"🟢 Score done | avg={sum(v) / len(v):.4f} | cost={time.time() - t_2:.3f}s"
-                )
-                for i, x in enumerate(scored, start=1):
+                ranked = [self._top_k(row, elements, k or 5) for row in score_matrix]
+                if query:
+                    scored = ranked[0]
+                if queries:
+                    batch_scored = ranked[q_rows:]
+
+                logger.info(f"🟢 Score done | cost={time.time() - t_2:.3f}s")
+                for i, x in enumerate(ranked[0], start=1):
                     logger.info(
                         f"   └ Top-{i}: score={x['score']:.4f} | {x['text'][:10]}"
                     )
@@ -131,17 +286,50 @@ class Embedding(object):
                 f"✅ [FINAL] Embedding tensor finished | elapsed={time.time() - start_ts:.3f}s"
             )
 
-            return {
+            resp = {
                 "query"        : query,
-                "query_vec"    : query_vec.tolist(),
+                "queries"      : queries or None,
                 "elements"     : elements,
-                "page_vectors" : page_vectors.tolist(),
                 "scores"       : scored,
+                "batch_scores" : batch_scored,
                 "count"        : count,
                 "dim"          : dim,
                 "model"        : "BAAI/bge-m3"
             }
 
+            # 只要打分结果时不回传任何向量
+            if scores_only:
+                return resp
+
+            # 打分完成后再降精度，只影响返回的向量
+            if dtype != "float32":
+                embeds       = embeds.astype(dtype)
+                query_vec    = query_vec.astype(dtype)
+                page_vectors = page_vectors.astype(dtype)
+
+            # 二进制格式直接返回原始字节，跳过 tolist 与逐元素校验
+            match fmt:
+                case const.VEC_BASE64:
+                    resp |= {
+                        "query_bytes" : query_vec.tobytes(),
+                        "page_bytes"  : page_vectors.tobytes(),
+                        "dtype"       : str(embeds.dtype)
+                    }
+                case const.VEC_NPY:
+                    buffer = io.BytesIO()
+                    numpy.save(buffer, embeds, allow_pickle=False)
+                    resp |= {
+                        "npy_bytes" : buffer.getvalue(),
+                        "dtype"     : str(embeds.dtype)
+                    }
+                case _:
+                    resp |= {
+                        "query_vec"    : query_vec.tolist(),
+                        "page_vectors" : page_vectors.tolist()
+                    }
+
+            return resp
+
         except Exception as e:
             logger.exception("❌ [ERROR] Embedding tensor failed")
             raise e
@@ -5,14 +5,16 @@
 # |___|_| |_|_|  \___|_|    |_|  \__,_|_|_| |_|\__|
 #
 
-import io
-import json
+import os
 import modal
-import numpy
 import typing
 from loguru import logger
+from services.sequential import (
+    packer, toolbox
+)
 from services.sequential.classifier.keras_classifier import KerasStruct
 from services.sequential.cutter.cut_range import VideoCutRange
+from services.sequential.hook import GreyHook
 from services.sequential.video import (
     VideoFrame, VideoObject
 )
@@ -48,6 +50,7 @@ class InferenceFaint(object):
         logger.info("🔥 Keras faint model loading ...")
         self.keras_sequential = KerasStruct()
         self.keras_sequential.load_model(src)
+        self.keras_sequential.warm_up()
         logger.info("🔥 Keras faint model loaded")
 
     @modal.method()
@@ -59,23 +62,45 @@ class InferenceFaint(object):
         }
 
     @modal.method(is_generator=True)
-    def classify_stream(self, meta_dict: dict, file_bytes: bytes) -> typing.Generator[str, None, None]:
+    def classify_stream(
+        self,
+        meta_dict: dict,
+        file_bytes: bytes
+    ) -> typing.Generator[typing.Union[str, bytes], None, None]:
         logger.info(f"========== Overflow Begin ==========")
 
+        stream_format: typing.Optional[str] = meta_dict.get("stream_format")
+
+        frame_path: typing.Optional[str] = None
+        grey_hook: typing.Optional[GreyHook] = None
         try:
-            meta     = FrameMeta(**meta_dict)
-            npz_data = numpy.load(io.BytesIO(file_bytes), allow_pickle=False)
-
-            keep_data    = False
-            frame_arrays = [npz_data[key] for key in npz_data.files]
-            frame_list   = [
-                VideoFrame(frame["frame_id"], frame["timestamp"], data)
-                for frame, data in zip(meta.frames_data, frame_arrays)
-            ]
+            meta = FrameMeta(**meta_dict)
+            stream_format = meta.stream_format
 
-            video = VideoObject(
-                meta.video_name, meta.video_path, meta.frame_count, tuple(frame_list)
+            # 上传内容只落盘一次，帧数据以内存映射视图的方式读取
+            frame_path = toolbox.dump_frame_file(
+                file_bytes,
+                toolbox.frame_file_suffix(file_bytes) or os.path.splitext(meta.video_path)[1] or None
             )
+            del file_bytes
+
+            keep_data = False
+
+            if toolbox.is_frame_file(frame_path):
+                frame_arrays = toolbox.load_frame_file(frame_path)
+                frame_list   = [
+                    VideoFrame(frame["frame_id"], frame["timestamp"], data)
+                    for frame, data in zip(meta.frames_data, frame_arrays)
+                ]
+                video = VideoObject(
+                    meta.video_name, meta.video_path, meta.frame_count, tuple(frame_list)
+                )
+            else:
+                # 上传的是视频文件，按需逐帧解码，不整体载入内存
+                logger.info(f"Frame file is not npz/npy, decode from video on demand")
+                video = VideoObject(
+                    meta.video_name, meta.video_path, meta.frame_count, None, source=frame_path
+                )
 
             cut_ranges = [
                 VideoCutRange(
@@ -91,14 +116,25 @@ class InferenceFaint(object):
                 for cr in meta.valid_range
             ]
 
-            frame_channel = toolset.judge_channel(
-                meta.frame_shape
-            ) or toolset.judge_channel(video.frame_detail()[-1])
+            if video.frames_data:
+                frame_channel = toolset.judge_channel(
+                    meta.frame_shape
+                ) or toolset.judge_channel(video.frame_detail()[-1])
+            else:
+                # 视频解码帧总是 BGR 三通道，以实际解码结果为准，不采信客户端 frame_shape
+                frame_channel = toolset.judge_channel(video.frame_detail()[-1])
             logger.info(f"Frame channel: {frame_channel}")
 
             model_channel = self.keras_sequential.model.input_shape[-1]
             logger.info(f"Model channel: {model_channel}")
 
+            # 视频帧转成模型所需的单通道，hook 只在本次调用内生效
+            if not video.frames_data and model_channel == 1 and frame_channel != 1:
+                grey_hook = GreyHook()
+                self.keras_sequential.add_hook(grey_hook)
+                frame_channel = 1
+                logger.info(f"Decoded frames converted to grey for model channel {model_channel}")
+
             matched: typing.Callable[[], bool] = lambda: frame_channel == model_channel
             if not matched():
                 stream = {
@@ -106,17 +142,28 @@ class InferenceFaint(object):
                         message := f"通道数不匹配 FCH={frame_channel} MCH={model_channel} 回退分析模式"
                     )
                 }
-                yield f"FATAL: {json.dumps(stream, ensure_ascii=False)}\n\n"
+                yield packer.dump_message("FATAL", stream, stream_format)
                 return logger.error(message)
 
             yield from self.keras_sequential.classify(
-                video, cut_ranges, meta.step, keep_data, meta.boost_mode
+                video,
+                cut_ranges,
+                meta.step,
+                keep_data,
+                meta.boost_mode,
+                meta.batch_size,
+                stream_format,
+                meta.workers
             )
         except Exception as e:
-            yield f"FATAL: {json.dumps({'fatal': str(e)}, ensure_ascii=False)}\n\n"
+            yield packer.dump_message("FATAL", {"fatal": str(e)}, stream_format)
             return logger.error(e)
 
         finally:
+            if grey_hook:
+                self.keras_sequential.remove_hook(grey_hook)
+            if frame_path and os.path.isfile(frame_path):
+                os.remove(frame_path)
             logger.info(f"========== Overflow Final ==========")
 
 
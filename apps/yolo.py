@@ -5,17 +5,26 @@
 #   |_|\___/|_|\___/   \___/|_|\__|_|  \__,_|
 #
 
-import io
+import os
+import cv2
+import json
+import time
 import modal
 import numpy
+import struct
 import typing
-from PIL import Image
+import hashlib
 from loguru import logger
+from concurrent.futures import ThreadPoolExecutor
 from ultralytics import YOLO
+from services.infrastructure.cache.redis_cache import RedisCache
+from services.infrastructure.cache.tiered_cache import TieredCache
 from images.yolo_image import (
     image, secrets
 )
-from utils import toolset
+from utils import (
+    const, toolset
+)
 
 # Notes: https://huggingface.co/Ultralytics/
 # yolo11s
@@ -36,13 +45,144 @@ toolset.init_logger()
 class Yolo(object):
 
     yolo_model: typing.Optional[YOLO] = None
+    decoder: typing.Optional[ThreadPoolExecutor] = None
+    cache: typing.Optional[TieredCache] = None
 
     @modal.enter()
     def startup(self) -> None:
         logger.info("🔥 Yolo model loading ...")
         self.yolo_model = YOLO(src)
+        self.decoder    = ThreadPoolExecutor(
+            max_workers=const.YOLO_DECODE_WORKERS, thread_name_prefix="decode"
+        )
+        self.cache = TieredCache(
+            "detection",
+            const.YOLO_CACHE_SIZE,
+            RedisCache(
+                os.environ["REDIS_URL"], os.environ["REDIS_KEY"]
+            ) if os.environ.get("REDIS_URL") else None,
+            const.YOLO_CACHE_TTL,
+            dumps=lambda objects: json.dumps(objects).encode(),
+            loads=json.loads
+        )
         logger.info("🔥 Yolo model loaded")
 
+    @modal.exit()
+    def shutdown(self) -> None:
+        if self.decoder:
+            self.decoder.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def _decode(
+        image_bytes: bytes,
+        image_format: typing.Optional[str] = None,
+        downscale: bool = False
+    ) -> tuple[numpy.ndarray, float]:
+        """
+        直接解码为 YOLO 所需的 BGR 数组，不经过 PIL。
+
+        Notes
+        -----
+        - raw 格式为 `<III`（height, width, channels）头 + uint8 BGR 像素，零拷贝还原
+        - downscale 时长边缩放到模型输入尺寸，返回缩放比例用于把检测框映射回原图
+        """
+
+        if image_format == const.YOLO_RAW:
+            h, w, c = struct.unpack_from(const.YOLO_RAW_HEAD, image_bytes)
+            if c != 3:
+                raise ValueError(f"raw image must have 3 BGR channels, got {c}")
+            image_arr = numpy.frombuffer(
+                image_bytes, dtype=numpy.uint8, count=h * w * c, offset=struct.calcsize(const.YOLO_RAW_HEAD)
+            ).reshape(h, w, c)
+        else:
+            image_arr = cv2.imdecode(numpy.frombuffer(image_bytes, dtype=numpy.uint8), cv2.IMREAD_COLOR)
+            if image_arr is None:
+                raise ValueError("cannot decode image bytes")
+
+        scale = 1.0
+        if downscale and (long_side := max(image_arr.shape[:2])) > const.YOLO_IMGSZ:
+            scale     = const.YOLO_IMGSZ / long_side
+            h, w      = image_arr.shape[:2]
+            image_arr = cv2.resize(
+                image_arr, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA
+            )
+
+        return image_arr, scale
+
+    def _parse(
+        self,
+        result: typing.Any,
+        min_conf: typing.Optional[float] = None,
+        classes: typing.Optional[list[str]] = None,
+        max_det: typing.Optional[int] = None,
+        scale: float = 1.0
+    ) -> list[dict]:
+        """
+        整张量解析检测框：xyxy / cls / conf 一次性转 NumPy，过滤后再序列化。
+        """
+
+        if result.boxes is None or len(result.boxes) == 0:
+            logger.warning("🟠 No boxes detected")
+            return []
+
+        boxes = result.boxes
+        xyxy  = (boxes.xyxy.cpu().numpy() / scale).astype(int)
+        cls   = boxes.cls.cpu().numpy().astype(int)
+        conf  = boxes.conf.cpu().numpy()
+        names = self.yolo_model.names
+
+        keep = numpy.ones(len(conf), dtype=bool)
+        if min_conf is not None:
+            keep &= conf >= min_conf
+        if classes:
+            keep &= numpy.isin(cls, [i for i, name in names.items() if name in set(classes)])
+
+        index = numpy.flatnonzero(keep)
+        index = index[numpy.argsort(-conf[index], kind="stable")]
+        if max_det:
+            index = index[:max_det]
+
+        objects = [
+            {"label": names[c], "bbox": b, "score": round(f, 4)}
+            for c, b, f in zip(cls[index].tolist(), xyxy[index].tolist(), conf[index].tolist())
+        ]
+
+        logger.info(
+            f"🟢 [YOLO] Parsed boxes | total={len(conf)} | kept={len(objects)} | "
+            f"min_conf={min_conf} | classes={classes} | max_det={max_det}"
+        )
+        for i, obj in enumerate(objects[:3], start=1):
+            logger.info(
+                f"   └ box[{i}] label={obj['label']} score={obj['score']:.3f} bbox={obj['bbox']}"
+            )
+
+        return objects
+
+    @staticmethod
+    def _phash(image_arr: numpy.ndarray, scale: float) -> str:
+        """
+        差值感知哈希（dHash）：灰度缩到 (n+1)×n 后比较相邻像素，
+        画面未变化或仅有压缩噪声的截图得到相同哈希；尺寸与缩放比例一并计入。
+        """
+
+        n     = const.YOLO_HASH_SIZE
+        gray  = cv2.cvtColor(image_arr, cv2.COLOR_BGR2GRAY)
+        small = cv2.resize(gray, (n + 1, n), interpolation=cv2.INTER_AREA)
+        bits  = numpy.packbits(small[:, 1:] > small[:, :-1]).tobytes().hex()
+        return f"{bits}:{image_arr.shape[0]}x{image_arr.shape[1]}@{scale:.6f}"
+
+    @staticmethod
+    def _cache_key(
+        mode: str,
+        digest: str,
+        min_conf: typing.Optional[float],
+        classes: typing.Optional[list[str]],
+        max_det: typing.Optional[int],
+        downscale: bool
+    ) -> str:
+        params = f"{min_conf}|{','.join(sorted(classes or []))}|{max_det}|{downscale}"
+        return f"yolo:{mode}:" + hashlib.sha1(f"yolo11s\x00{digest}\x00{params}".encode()).hexdigest()
+
     @modal.method()
     async def heartbeat(self) -> dict:
         return {
@@ -52,60 +192,130 @@ class Yolo(object):
         }
 
     @modal.method()
-    async def detection(self, image_bytes: bytes) -> dict:
+    async def detection(
+        self,
+        image_bytes: bytes,
+        min_conf: typing.Optional[float] = None,
+        classes: typing.Optional[list[str]] = None,
+        max_det: typing.Optional[int] = None,
+        image_format: typing.Optional[str] = None,
+        downscale: bool = False,
+        cache_mode: str = const.YOLO_CACHE_EXACT
+    ) -> dict:
         logger.info(f"🟡 [BEGIN] Detection start")
-        logger.info(f"🟢 Image bytes size={len(image_bytes)}")
+        logger.info(f"🟢 Image bytes size={len(image_bytes)} | cache={cache_mode}")
 
-        # ===== Step 1: bytes -> PIL =====
-        image_pil = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-        logger.info(
-            f"🟢 [1/5] Image decoded (PIL) size={image_pil.size}"
-        )
+        key = None
+        options = (min_conf, classes, max_det, downscale)
 
-        # ===== Step 2: PIL -> numpy =====
-        image_arr = numpy.array(image_pil)
+        # ===== Step 0: 精确哈希命中时连解码都跳过 =====
+        if cache_mode == const.YOLO_CACHE_EXACT:
+            key = self._cache_key(cache_mode, hashlib.sha1(image_bytes).hexdigest(), *options)
+            if (objects := (await self.cache.get_many([key])).get(key)) is not None:
+                logger.info(f"✅ [FINAL] Detection cache hit (exact) objects={len(objects)}")
+                return {"objects": objects, "count": len(objects)}
+
+        # ===== Step 1: bytes -> numpy (BGR) =====
+        image_arr, scale = self._decode(image_bytes, image_format, downscale)
         logger.info(
-            f"🟢 [2/5] Image converted to numpy shape={image_arr.shape} dtype={image_arr.dtype}"
+            f"🟢 [1/3] Image decoded shape={image_arr.shape} dtype={image_arr.dtype} scale={scale:.3f}"
         )
 
-        # ===== Step 3: YOLO inference =====
+        if cache_mode == const.YOLO_CACHE_PHASH:
+            key = self._cache_key(cache_mode, self._phash(image_arr, scale), *options)
+            if (objects := (await self.cache.get_many([key])).get(key)) is not None:
+                logger.info(f"✅ [FINAL] Detection cache hit (phash) objects={len(objects)}")
+                return {"objects": objects, "count": len(objects)}
+
+        # ===== Step 2: YOLO inference =====
         values = self.yolo_model(image_arr, verbose=False)
-        result = values[0]
-        logger.info(f"🟢 [3/5] YOLO inference done")
+        logger.info(f"🟢 [2/3] YOLO inference done")
+
+        # ===== Step 3: Parse results =====
+        objects = self._parse(values[0], min_conf, classes, max_det, scale)
+
+        logger.info(f"🟢 [3/3] Result parsed objects={len(objects)}")
+        if key:
+            await self.cache.set_many({key: objects})
+        logger.info(f"✅ [FINAL] Detection finished")
+
+        return {
+            "objects" : objects,
+            "count"   : len(objects),
+        }
 
-        # ===== Step 4: Parse results =====
-        objects: list[dict] = []
+    @modal.method()
+    async def detection_batch(
+        self,
+        images: list[bytes],
+        min_conf: typing.Optional[float] = None,
+        classes: typing.Optional[list[str]] = None,
+        max_det: typing.Optional[int] = None,
+        formats: typing.Optional[list[typing.Optional[str]]] = None,
+        downscale: bool = False,
+        cache_mode: str = const.YOLO_CACHE_EXACT
+    ) -> dict:
+        """
+        多张图片并行解码后作为一个 list 送入 YOLO，一次前向完成整批检测；
+        命中缓存的图片不参与推理。
+        """
 
-        if result.boxes is None:
-            logger.warning("🟠 [4/5] No boxes detected (result.boxes is None)")
-            return {"objects": objects, "count": 0}
+        start_ts = time.time()
 
-        total_boxes = len(result.boxes)
+        logger.info(f"🟡 [BEGIN] Detection batch start")
         logger.info(
-            f"🟢 [YOLO - 4/5] Parsing boxes | total_boxes={total_boxes}"
+            f"🟢 Image count={len(images)} | bytes={sum(len(b) for b in images)} | cache={cache_mode}"
         )
 
-        for idx, box in enumerate(result.boxes, start=1):
-            cls = int(box.cls[0])
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            cfg = float(box.conf[0])
-
-            obj = {
-                "label" : self.yolo_model.names[cls],
-                "bbox"  : [x1, y1, x2, y2],
-                "score" : round(cfg, 4),
-            }
-            objects.append(obj)
-            logger.info(
-                f"   └ box[{idx}] label={obj['label']} score={obj['score']:.3f} bbox={obj['bbox']}"
-            )
+        formats = formats or [None] * len(images)
+        options = (min_conf, classes, max_det, downscale)
+        keys: list[typing.Optional[str]] = [None] * len(images)
+        found: list[typing.Optional[list[dict]]] = [None] * len(images)
 
-        logger.info(f"🟢 [5/5] Result parsed objects={len(objects)}")
-        logger.info(f"✅ [FINAL] Detection finished")
+        # ===== Step 0: 精确哈希命中的图片不解码 =====
+        if cache_mode == const.YOLO_CACHE_EXACT:
+            keys  = [self._cache_key(cache_mode, hashlib.sha1(b).hexdigest(), *options) for b in images]
+            hits  = await self.cache.get_many(keys)
+            found = [hits.get(k) for k in keys]
+        todo = [i for i in range(len(images)) if found[i] is None]
+
+        # ===== Step 1: 并行解码 =====
+        decoded = dict(zip(todo, self.decoder.map(
+            lambda i: self._decode(images[i], formats[i], downscale), todo
+        )))
+        logger.info(
+            f"🟢 [1/3] Images decoded shapes={[decoded[i][0].shape for i in todo]}"
+        )
+
+        if cache_mode == const.YOLO_CACHE_PHASH:
+            for i in todo:
+                keys[i] = self._cache_key(cache_mode, self._phash(*decoded[i]), *options)
+            hits = await self.cache.get_many([keys[i] for i in todo])
+            for i in todo:
+                found[i] = hits.get(keys[i])
+            todo = [i for i in todo if found[i] is None]
+
+        logger.info(f"   └ cache | hit={len(images) - len(todo)} | miss={len(todo)} | lru={len(self.cache)}")
+
+        # ===== Step 2: 整批推理（letterbox 对齐到同一输入尺寸） =====
+        values = self.yolo_model([decoded[i][0] for i in todo], verbose=False) if todo else []
+        logger.info(f"🟢 [2/3] YOLO batch inference done")
+
+        # ===== Step 3: 逐图解析 =====
+        for i, result in zip(todo, values):
+            found[i] = self._parse(result, min_conf, classes, max_det, decoded[i][1])
+        await self.cache.set_many({keys[i]: found[i] for i in todo if keys[i]})
+
+        results = [{"objects": objects, "count": len(objects)} for objects in found]
+
+        logger.info(f"🟢 [3/3] Result parsed objects={sum(r['count'] for r in results)}")
+        logger.info(
+            f"✅ [FINAL] Detection batch finished | elapsed={time.time() - start_ts:.3f}s"
+        )
 
         return {
-            "objects" : objects,
-            "count"   : len(objects),
+            "results" : results,
+            "count"   : len(results),
         }
 
 
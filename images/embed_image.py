@@ -23,7 +23,8 @@ image = modal.Image.debian_slim(
     "models/cross_encoder", "/root/models/cross_encoder"
 )
 secrets = [
-    modal.Secret.from_name("SHARED_SECRET")
+    modal.Secret.from_name("SHARED_SECRET"),
+    modal.Secret.from_name("REDIS")
 ]
 
 
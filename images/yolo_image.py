@@ -25,7 +25,8 @@ image = modal.Image.debian_slim(
     "models/yolo_11", "/root/models/yolo_11"
 )
 secrets = [
-    modal.Secret.from_name("SHARED_SECRET")
+    modal.Secret.from_name("SHARED_SECRET"),
+    modal.Secret.from_name("REDIS")
 ]
 
 
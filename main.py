@@ -41,7 +41,7 @@ def api_main():
         )
         wapp.state.shared_secret = os.environ["SHARED_SECRET"]
         yield
-        await wapp.state.cache.client.close()
+        await wapp.state.cache.close()
 
     web_app = FastAPI(lifespan=lifespan)
 
@@ -7,9 +7,11 @@
 #
 
 import modal
+import base64
+import typing
 from loguru import logger
 from fastapi import (
-    APIRouter, Request
+    APIRouter, Request, Response
 )
 from schemas.cognitive import (
     TensorRequest, TensorResponse
@@ -28,23 +30,47 @@ embedding_router = APIRouter(tags=["Embedding"])
 async def api_tensor_en(
     request: Request,
     payload: TensorRequest
-) -> TensorResponse:
+) -> typing.Union[TensorResponse, Response]:
     logger.info(f"**> {request.method} {request.url}")
 
     f = modal.Cls.from_name(app_name=const.GROUP_FUNC, name="Embedding")
 
     try:
         query    = payload.query
+        queries  = payload.queries
         elements = payload.elements
         s        = payload.s
         k        = payload.k
-        mesh     = ([query] if query else []) + (elements or [])
+        mesh     = ([query] if query else []) + (queries or []) + (elements or [])
 
         if not mesh: raise BizError(
             status_code=400, detail="query and elements required"
         )
 
-        resp = await f().tensor.remote.aio(query, elements, mesh, s, k)
+        resp = await f().tensor.remote.aio(
+            query, elements, mesh, s, k, payload.fmt, queries, payload.scores_only,
+            payload.dim, payload.dtype
+        )
+
+        if payload.scores_only:
+            return TensorResponse(**resp)
+
+        match payload.fmt:
+            case const.VEC_NPY:
+                return Response(
+                    content=resp["npy_bytes"],
+                    media_type="application/octet-stream",
+                    headers={
+                        "X-Count" : str(resp["count"]),
+                        "X-Dim"   : str(resp["dim"]),
+                        "X-Dtype" : resp["dtype"],
+                        "X-Query" : str(len(mesh) - len(elements or []))
+                    }
+                )
+            case const.VEC_BASE64:
+                resp["query_vec_b64"]    = base64.b64encode(resp.pop("query_bytes")).decode()
+                resp["page_vectors_b64"] = base64.b64encode(resp.pop("page_bytes")).decode()
+
         return TensorResponse(**resp)
 
     finally:
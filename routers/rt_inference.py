@@ -14,6 +14,10 @@ from fastapi import (
 from fastapi.responses import StreamingResponse
 
 from schemas.errors import BizError
+# Notes: 流格式常量只在 sequential 中定义一份，该模块无第三方依赖，网关可直接导入
+from services.sequential.const import (
+    STREAM_SSE, STREAM_PACKED, STREAM_SEGMENT
+)
 from utils import (
     const, toolset
 )
@@ -62,9 +66,20 @@ async def api_predict(request: Request) -> StreamingResponse:
             status_code=400, detail="Bad Request"
         )
 
+    # 未知格式直接拒绝，避免静默回退为 sse 而客户端按其它格式解析
+    if (stream_format := meta_dict.get("stream_format")) not in (
+        None, STREAM_SSE, STREAM_PACKED, STREAM_SEGMENT
+    ):
+        raise BizError(
+            status_code=400, detail=f"unsupported stream_format: {stream_format}"
+        )
+
+    # packed 模式下每个数据块为 4 字节标签 + 4 字节长度 + 负载
+    media_type = "application/octet-stream" if stream_format == STREAM_PACKED else "text/event-stream"
+
     return StreamingResponse(
         f().classify_stream.remote_gen(meta_dict, file_bytes),
-        media_type="text/event-stream"
+        media_type=media_type
     )
 
 
@@ -10,7 +10,9 @@ from loguru import logger
 from fastapi import (
     APIRouter, Request
 )
-from schemas.cognitive import RerankResponse
+from schemas.cognitive import (
+    RerankResponse, RerankBatchRequest, RerankBatchResponse
+)
 from schemas.errors import BizError
 from utils import const
 
@@ -46,5 +48,32 @@ async def api_rerank(request: Request) -> RerankResponse:
         logger.info(f"**> {('=' * 12)}")
 
 
+@rerank_router.post(
+    path="/rerank/batch",
+    response_model=RerankBatchResponse,
+    operation_id="api_rerank_batch"
+)
+async def api_rerank_batch(
+    request: Request,
+    payload: RerankBatchRequest
+) -> RerankBatchResponse:
+    logger.info(f"**> {request.method} {request.url}")
+
+    f = modal.Cls.from_name(app_name=const.GROUP_FUNC, name="CrossENC")
+
+    try:
+        groups = [
+            {"query": group.query, "candidate": group.candidate} for group in payload.groups
+        ]
+
+        resp = await f().rerank_batch.remote.aio(
+            groups, payload.k
+        )
+        return RerankBatchResponse(**resp)
+
+    finally:
+        logger.info(f"**> {('=' * 12)}")
+
+
 if __name__ == '__main__':
     pass
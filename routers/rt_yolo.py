@@ -5,14 +5,22 @@
 #   |_|\___/|_|\___/  |_| \_\___/ \__,_|\__\___|_|
 #
 
+import json
 import time
 import modal
+import typing
 from loguru import logger
 from fastapi import (
     APIRouter, Request
 )
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from starlette.datastructures import (
+    FormData, UploadFile
+)
 from schemas.cognitive import (
-    YoloObject, YoloDetectionRequest, YoloDetectionResponse
+    YoloObject, YoloFilter, YoloDetectionRequest, YoloDetectionResponse,
+    YoloBatchRequest, YoloBatchItem, YoloBatchResponse
 )
 from schemas.errors import BizError
 from utils import (
@@ -22,29 +30,118 @@ from utils import (
 yolo_router = APIRouter(tags=["Yolo"])
 
 
+async def _read_json(request: Request) -> YoloDetectionRequest:
+    """
+    JSON 请求体按 FastAPI 自身的方式校验，出错时同样返回 422，保持原有 base64 调用方的行为。
+    """
+
+    try:
+        body = await request.json()
+    except json.JSONDecodeError as e:
+        raise RequestValidationError([{
+            "type"  : "json_invalid",
+            "loc"   : ("body", e.pos),
+            "msg"   : "JSON decode error",
+            "input" : {},
+            "ctx"   : {"error": e.msg}
+        }])
+
+    try:
+        return YoloDetectionRequest.model_validate(body)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors()], body=body
+        )
+
+
+async def _read_upload(request: Request) -> tuple[bytes, typing.Optional[str], YoloFilter]:
+    """
+    按 Content-Type 读取图片与过滤参数。
+
+    Notes
+    -----
+    - multipart/form-data：`image_file` 为图片，其余表单字段为参数
+    - image/* 或 application/octet-stream：请求体即图片，参数走 query string
+    - 其它按 JSON（YoloDetectionRequest）处理，兼容原有 base64 调用，校验失败仍为 422
+    """
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    try:
+        if content_type == "multipart/form-data":
+            form: FormData = await request.form()
+            if not isinstance(image_file := form.get("image_file"), UploadFile):
+                raise BizError(
+                    status_code=400, detail="image_file must be uploaded as a file"
+                )
+            image_bytes = await image_file.read()
+            params      = {k: v for k, v in form.items() if k != "image_file"}
+            mime        = (image_file.content_type or "").lower()
+            subtype     = mime.partition("/")[2] if mime.startswith("image/") else ""
+
+        elif content_type.startswith("image/") or content_type == "application/octet-stream":
+            image_bytes = await request.body()
+            params      = dict(request.query_params)
+            subtype     = content_type.partition("/")[2] if content_type.startswith("image/") else ""
+
+        else:
+            payload = await _read_json(request)
+            return toolset.secure_b64decode(payload.image_base64), payload.image_format, payload
+
+        if isinstance(classes := params.get("classes"), str):
+            params["classes"] = [c.strip() for c in classes.split(",") if c.strip()]
+
+        return image_bytes, params.pop("image_format", None) or subtype or None, YoloFilter.model_validate(params)
+
+    except (KeyError, ValueError) as e:
+        raise BizError(status_code=400, detail=f"invalid yolo request: {e}")
+
+
 @yolo_router.post(
     path="/yolo",
     response_model=YoloDetectionResponse,
-    operation_id="api_yolo"
+    operation_id="api_yolo",
+    openapi_extra={
+        "requestBody": {
+            "content": {
+                "application/json": {
+                    "schema": YoloDetectionRequest.model_json_schema()
+                },
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "properties": {
+                            "image_file": {"type": "string", "format": "binary"}
+                        } | YoloFilter.model_json_schema()["properties"],
+                        "required": ["image_file"]
+                    }
+                },
+                "image/*": {
+                    "schema": {"type": "string", "format": "binary"}
+                }
+            }
+        }
+    }
 )
-async def api_yolo_detection(
-    request: Request,
-    payload: YoloDetectionRequest
-) -> YoloDetectionResponse:
+async def api_yolo_detection(request: Request) -> YoloDetectionResponse:
 
     logger.info(f"**> {request.method} {request.url}")
 
     try:
-        # ✅ 1. Base64 → bytes（只在 HTTP 边界）
-        if not (image_bytes := toolset.secure_b64decode(payload.image_base64)):
+        # ✅ 1. 读取图片 bytes（JSON base64 / multipart / 原始二进制）
+        image_bytes, image_format, options = await _read_upload(request)
+        if not image_bytes:
             raise BizError(
                 status_code=400, detail="empty image file"
             )
 
-        f = modal.Cls.from_name(app_name=const.GROUP_FUNC, name="YoloUltra")
+        f = modal.Cls.from_name(app_name=const.GROUP_FUNC, name="Yolo")
 
         # ✅ 2. Modal 调用（只传 bytes）
-        results_raw = await f().detection.remote.aio(image_bytes)
+        results_raw = await f().detection.remote.aio(
+            image_bytes, options.min_conf, options.classes, options.max_det,
+            image_format, options.downscale, options.cache
+        )
         objects_raw = results_raw.get("objects", [])
 
         # ✅ 3. 结构化结果
@@ -70,5 +167,62 @@ async def api_yolo_detection(
         logger.info(f"**> {('=' * 12)}")
 
 
+@yolo_router.post(
+    path="/yolo/batch",
+    response_model=YoloBatchResponse,
+    operation_id="api_yolo_batch"
+)
+async def api_yolo_detection_batch(
+    request: Request,
+    payload: YoloBatchRequest
+) -> YoloBatchResponse:
+
+    logger.info(f"**> {request.method} {request.url}")
+
+    try:
+        # ✅ 1. Base64 → bytes（只在 HTTP 边界）
+        images = [toolset.secure_b64decode(item.image_base64) for item in payload.images]
+        if not all(images):
+            raise BizError(
+                status_code=400, detail="empty image file"
+            )
+
+        f = modal.Cls.from_name(app_name=const.GROUP_FUNC, name="Yolo")
+
+        # ✅ 2. Modal 调用（整批 bytes 一次往返）
+        results_raw = await f().detection_batch.remote.aio(
+            images, payload.min_conf, payload.classes, payload.max_det,
+            [item.image_format for item in payload.images], payload.downscale, payload.cache
+        )
+
+        # ✅ 3. 结构化结果
+        results = [
+            YoloBatchItem(
+                index=n,
+                count=item["count"],
+                objects=[
+                    YoloObject(
+                        index=i,
+                        label=obj["label"],
+                        bbox=obj["bbox"],
+                        score=obj["score"]
+                    ) for i, obj in enumerate(item["objects"])
+                ]
+            ) for n, item in enumerate(results_raw.get("results", []))
+        ]
+
+        # ✅ 4. 下发结构化结果
+        return YoloBatchResponse(
+            status="ok",
+            model="yolo11s",
+            results=results,
+            count=len(results),
+            ts=int(time.time())
+        )
+
+    finally:
+        logger.info(f"**> {('=' * 12)}")
+
+
 if __name__ == '__main__':
     pass
@@ -22,6 +22,22 @@ class FrameMeta(BaseModel):
     step: typing.Optional[int] = None
     keep_data: typing.Optional[bool] = None
     boost_mode: typing.Optional[bool] = None
+    batch_size: typing.Optional[int] = Field(
+        None,
+        ge=1,
+        le=128,
+        description="单次推理的帧数，决定预分配 batch 张量大小"
+    )
+    stream_format: typing.Optional[typing.Literal["sse", "packed", "segment"]] = Field(
+        None,
+        description="结果流格式，不传时为 sse"
+    )
+    workers: typing.Optional[int] = Field(
+        None,
+        ge=0,
+        le=8,
+        description="预处理线程数，0 或不传时不启用流水线"
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -51,11 +67,21 @@ class TensorRequest(BaseModel):
         examples=[["立即支付", "确认付款", "取消订单"]]
     )
 
+    queries: typing.Optional[list[str]] = Field(
+        None,
+        description="批量查询文本，与 elements 一次矩阵乘法打分，结果见 batch_scores"
+    )
+
     s: bool = Field(
         False,
         description="是否返回 query 与 elements 的相似度 scores（Top-K）"
     )
 
+    scores_only: bool = Field(
+        False,
+        description="只返回 scores / batch_scores，不返回任何向量，仅在 s=true 时有意义"
+    )
+
     k: int = Field(
         5,
         ge=1,
@@ -63,6 +89,26 @@ class TensorRequest(BaseModel):
         description="返回的 K 相似结果数量，仅在 s=true 时生效"
     )
 
+    fmt: typing.Literal["json", "base64", "npy"] = Field(
+        "json",
+        description=(
+            "向量输出格式：json 为浮点数组；base64 为 query_vec_b64 / page_vectors_b64 小端字节；"
+            "npy 直接返回 application/octet-stream 的 .npy 矩阵（有 query 时首行为 query）"
+        )
+    )
+
+    dim: typing.Optional[int] = Field(
+        None,
+        ge=32,
+        le=1024,
+        description="截断输出维度（Matryoshka），取前 dim 维后重新 L2 归一化，打分同样基于截断向量"
+    )
+
+    dtype: typing.Literal["float32", "float16"] = Field(
+        "float32",
+        description="向量输出精度，float16 仅影响返回的向量，打分仍按 float32 计算"
+    )
+
 
 class TensorResponse(BaseModel):
     query: typing.Optional[str] = Field(None, description="原始输入文本")
@@ -82,6 +128,20 @@ class TensorResponse(BaseModel):
         examples=[[0.298, -0.111, 0.552]]
     )
 
+    query_vec_b64: typing.Optional[str] = Field(
+        None,
+        description="query 向量的 base64 字节，形状为 (dim,)，仅在 fmt=base64 时返回"
+    )
+    page_vectors_b64: typing.Optional[str] = Field(
+        None,
+        description="elements 向量的 base64 字节，行优先，形状为 (len(elements), dim)，仅在 fmt=base64 时返回"
+    )
+    dtype: typing.Optional[str] = Field(
+        None,
+        description="二进制向量的数据类型",
+        examples=["float32"]
+    )
+
     scores: typing.Optional[list[ScoreItem]] = Field(
         None,
         description=(
@@ -91,6 +151,12 @@ class TensorResponse(BaseModel):
         )
     )
 
+    queries: typing.Optional[list[str]] = Field(None, description="批量查询文本")
+    batch_scores: typing.Optional[list[list[ScoreItem]]] = Field(
+        None,
+        description="queries 中每个查询的 Top-K 结果，顺序与 queries 一致"
+    )
+
     count: int = Field(..., description="向量数量", examples=[2])
     dim: int = Field(..., description="向量维度", examples=[768])
     model: str = Field(..., description="使用的 embedding 模型", examples=["bge-m3"])
@@ -109,6 +175,48 @@ class RerankResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class RerankGroup(BaseModel):
+    query: str = Field(..., min_length=1, description="查询文本")
+    candidate: list[str] = Field(..., min_length=1, description="该查询的候选文本列表")
+
+
+class RerankBatchRequest(BaseModel):
+    groups: list[RerankGroup] = Field(
+        ..., min_length=1, description="多组 (query, candidate)，所有 pair 合并为一次推理"
+    )
+    k: typing.Optional[int] = Field(
+        None,
+        ge=1,
+        le=100,
+        description="每组返回的 Top-K，不传则只返回 scores"
+    )
+
+
+class RerankItem(BaseModel):
+    index: int = Field(..., description="候选在该组 candidate 中的下标")
+    score: float = Field(..., description="Rerank 打分")
+    text: str = Field(..., description="候选文本")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RerankGroupResult(BaseModel):
+    scores: list[float] = Field(..., description="按输入顺序对应 candidate 的打分")
+    count: int = Field(..., description="评分条数，等于该组 candidate 数量")
+    top: typing.Optional[list[RerankItem]] = Field(
+        None, description="按得分降序的 Top-K，仅在传入 k 时返回"
+    )
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class RerankBatchResponse(BaseModel):
+    groups: list[RerankGroupResult] = Field(..., description="顺序与请求 groups 一致")
+    count: int = Field(..., description="所有组的评分总条数")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class YoloObject(BaseModel):
     index: int = Field(..., description="对象索引，用于 LLM / Action 引用")
     label: str = Field(..., description="YOLO 识别的类别名称")
@@ -120,9 +228,35 @@ class YoloObject(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
-class YoloDetectionRequest(BaseModel):
+class YoloFilter(BaseModel):
+    min_conf: typing.Optional[float] = Field(
+        None, ge=0.0, le=1.0, description="最低置信度，低于该值的检测框被丢弃"
+    )
+    classes: typing.Optional[list[str]] = Field(
+        None, description="类别白名单（YOLO 类别名称），不传则不过滤"
+    )
+    max_det: typing.Optional[int] = Field(
+        None, ge=1, le=1000, description="按置信度降序最多返回的检测框数量"
+    )
+    downscale: bool = Field(
+        False, description="推理前在服务端把长边缩放到模型输入尺寸，检测框仍按原图坐标返回"
+    )
+    cache: typing.Literal["off", "exact", "phash"] = Field(
+        "exact",
+        description="检测结果缓存：exact 按图片字节哈希；phash 按感知哈希，近似相同的截图也可命中；off 不使用缓存"
+    )
+
+
+class YoloImage(BaseModel):
     image_base64: str
-    image_format: typing.Optional[str] = "png"
+    image_format: typing.Optional[str] = Field(
+        "png",
+        description="图片编码格式；raw 表示 `<III`（height, width, channels）头 + uint8 BGR 像素"
+    )
+
+
+class YoloDetectionRequest(YoloImage, YoloFilter):
+    pass
 
 
 class YoloDetectionResponse(BaseModel):
@@ -135,6 +269,30 @@ class YoloDetectionResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class YoloBatchRequest(YoloFilter):
+    images: list[YoloImage] = Field(
+        ..., min_length=1, max_length=16, description="待检测图片列表，整批一次前向推理"
+    )
+
+
+class YoloBatchItem(BaseModel):
+    index: int = Field(..., description="图片在请求 images 中的下标")
+    count: int = Field(..., description="该图片检测到的对象数量")
+    objects: list[YoloObject] = Field(default_factory=list)
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class YoloBatchResponse(BaseModel):
+    status: str = Field("ok", description="接口状态")
+    model: str = Field(..., description="YOLO 模型名称")
+    count: int = Field(..., description="图片数量")
+    results: list[YoloBatchItem] = Field(default_factory=list)
+    ts: int = Field(..., description="Unix 时间戳（秒）")
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class Mix(BaseModel):
     app: dict[str, typing.Any] = Field(default_factory=dict)
     white_list: list[str] = Field(default_factory=list)
@@ -0,0 +1,46 @@
+#  _                     _   _       ____             _        _
+# | |    ___ _ __   __ _| |_| |__   | __ ) _   _  ___| | _____| |_
+# | |   / _ \ '_ \ / _` | __| '_ \  |  _ \| | | |/ __| |/ / _ \ __|
+# | |__|  __/ | | | (_| | |_| | | | | |_) | |_| | (__|   <  __/ |_
+# |_____\___|_| |_|\__, |\__|_| |_| |____/ \__,_|\___|_|\_\___|\__|
+#                  |___/
+#
+
+import typing
+
+
+def bucket_by_tokens(
+    lengths: list[int],
+    token_budget: int,
+    max_batch: typing.Optional[int] = None
+) -> list[list[int]]:
+    """
+    按 token 长度分桶。
+
+    Notes
+    -----
+    下标按长度降序排列后依次装桶，桶内填充长度即首个元素的长度，
+    保证 `桶内条数 × 填充长度 <= token_budget`（单条超长时独占一桶）。
+    返回的每个桶是原始下标列表，调用方据此把结果写回原位置。
+    """
+
+    order = sorted(range(len(lengths)), key=lengths.__getitem__, reverse=True)
+
+    buckets: list[list[int]] = []
+    current: list[int]       = []
+    for index in order:
+        if current and (
+                (len(current) + 1) * lengths[current[0]] > token_budget
+                or (max_batch and len(current) >= max_batch)
+        ):
+            buckets.append(current)
+            current = []
+        current.append(index)
+
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,93 @@
+#  __  __ _                  ____        _       _
+# |  \/  (_) ___ _ __ ___   | __ )  __ _| |_ ___| |__
+# | |\/| | |/ __| '__/ _ \  |  _ \ / _` | __/ __| '_ \
+# | |  | | | (__| | | (_) | | |_) | (_| | || (__| | | |
+# |_|  |_|_|\___|_|  \___/  |____/ \__,_|\__\___|_| |_|
+#
+
+import asyncio
+import typing
+from loguru import logger
+
+
+class MicroBatcher(object):
+    """
+    异步请求合并调度器。
+
+    Notes
+    -----
+    并发到达的多个调用先进入队列，调度协程在 `max_wait` 秒内持续收集，
+    直到累计文本长度达到 `max_tokens` 或等待超时，随后把所有文本合并成
+    一次 `handler` 调用，再按各调用的输入条数把结果切片还给调用方。
+
+    `handler` 在线程中执行，接收合并后的文本列表，返回按行对应的结果
+    （如 numpy 数组）。文本长度以字符数近似 token 数。
+    """
+
+    def __init__(
+        self,
+        handler: typing.Callable[[list[str]], typing.Any],
+        max_wait: float,
+        max_tokens: int
+    ) -> None:
+
+        self.handler    = handler
+        self.max_wait   = max_wait
+        self.max_tokens = max_tokens
+
+        self.queue: typing.Optional[asyncio.Queue] = None
+        self.worker: typing.Optional[asyncio.Task] = None
+
+    @staticmethod
+    def measure(texts: list[str]) -> int:
+        return sum(len(t) for t in texts)
+
+    async def submit(self, texts: list[str]) -> typing.Any:
+        """提交一组文本，等待合并推理后返回属于本组的结果。"""
+        if self.worker is None or self.worker.done():
+            self.queue  = asyncio.Queue()
+            self.worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def _collect(self) -> list[tuple[list[str], asyncio.Future]]:
+        group  = [await self.queue.get()]
+        tokens = self.measure(group[0][0])
+
+        loop     = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while tokens < self.max_tokens and (timeout := deadline - loop.time()) > 0:
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            group.append(item)
+            tokens += self.measure(item[0])
+
+        return group
+
+    async def _run(self) -> None:
+        while True:
+            group = await self._collect()
+            union = [t for texts, _ in group for t in texts]
+            logger.info(f"🟢 MicroBatch merged | calls={len(group)} | texts={len(union)}")
+
+            try:
+                results = await asyncio.to_thread(self.handler, union)
+            except Exception as e:
+                for _, future in group:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for texts, future in group:
+                if not future.done():
+                    future.set_result(results[offset: offset + len(texts)])
+                offset += len(texts)
+
+
+if __name__ == '__main__':
+    pass
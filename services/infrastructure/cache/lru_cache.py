@@ -0,0 +1,50 @@
+#  _     ____  _   _    ____           _
+# | |   |  _ \| | | |  / ___|__ _  ___| |__   ___
+# | |   | |_) | | | | | |   / _` |/ __| '_ \ / _ \
+# | |___|  _ <| |_| | | |__| (_| | (__| | | |  __/
+# |_____|_| \_\\___/   \____\__,_|\___|_| |_|\___|
+#
+
+import typing
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    进程内 LRU 缓存。
+
+    Notes
+    -----
+    容器内的一级缓存，超过容量时淘汰最久未访问的条目。
+    只在单个事件循环内访问，不做加锁。
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.store: OrderedDict[str, typing.Any] = OrderedDict()
+
+        self.hits   = 0
+        self.misses = 0
+
+    def get(self, key: str) -> typing.Optional[typing.Any]:
+        """获取值并刷新访问顺序，未命中返回 None。"""
+        if (value := self.store.get(key)) is None:
+            self.misses += 1
+            return None
+        self.store.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: typing.Any) -> None:
+        """写入值，超出容量时淘汰最旧条目。"""
+        self.store[key] = value
+        self.store.move_to_end(key)
+        while len(self.store) > self.capacity:
+            self.store.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+
+if __name__ == '__main__':
+    pass
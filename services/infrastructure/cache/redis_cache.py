@@ -34,6 +34,14 @@ class RedisCache(object):
             username="default",
             password=password
         )
+        # 二进制值（如向量字节）使用不解码的独立连接
+        self.raw_client = redis.Redis(
+            host=host,
+            port=14381,
+            decode_responses=False,
+            username="default",
+            password=password
+        )
 
     async def get(self, key: str) -> typing.Optional[typing.Union[dict, list, str, int, float]]:
         """获取字符串类型的值。"""
@@ -67,6 +75,26 @@ class RedisCache(object):
         """获取 Key 剩余生存时间。"""
         return int(await self.client.ttl(key))
 
+    async def mget_bytes(self, keys: list[str]) -> list[typing.Optional[bytes]]:
+        """批量获取二进制值，不存在的 Key 对应 None。"""
+        if not keys:
+            return []
+        return list(await self.raw_client.mget(keys))
+
+    async def mset_bytes(self, mapping: dict[str, bytes], *, ttl: typing.Optional[int] = None) -> None:
+        """批量设置二进制值。"""
+        if not mapping:
+            return None
+        async with self.raw_client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ttl)
+            await pipe.execute()
+
+    async def close(self) -> None:
+        """关闭全部连接。"""
+        await self.client.close()
+        await self.raw_client.close()
+
 
 if __name__ == '__main__':
     pass
@@ -0,0 +1,97 @@
+#  _____ _                   _    ____           _
+# |_   _(_) ___ _ __ ___  __| |  / ___|__ _  ___| |__   ___
+#   | | | |/ _ \ '__/ _ \/ _` | | |   / _` |/ __| '_ \ / _ \
+#   | | | |  __/ | |  __/ (_| | | |__| (_| | (__| | | |  __/
+#   |_| |_|\___|_|  \___|\__,_|  \____\__,_|\___|_| |_|\___|
+#
+
+import typing
+from loguru import logger
+from services.infrastructure.cache.lru_cache import LRUCache
+from services.infrastructure.cache.redis_cache import RedisCache
+
+
+class TieredCache(object):
+    """
+    容器内 LRU + 可选 Redis 的两级缓存。
+
+    Notes
+    -----
+    调用方只负责生成 Key 以及值与字节之间的序列化方式；
+    查询顺序为 LRU → Redis，Redis 命中会回填 LRU，写入时两级同时写。
+    Redis 不可用时只记录告警，退化为纯 LRU，不影响请求本身。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        capacity: int,
+        redis: typing.Optional[RedisCache],
+        ttl: typing.Optional[int],
+        dumps: typing.Callable[[typing.Any], bytes],
+        loads: typing.Callable[[bytes], typing.Any]
+    ) -> None:
+        self.name  = name
+        self.lru   = LRUCache(capacity)
+        self.redis = redis
+        self.ttl   = ttl
+        self.dumps = dumps
+        self.loads = loads
+
+    async def get_many(self, keys: typing.Iterable[str]) -> dict[str, typing.Any]:
+        """批量查询，只返回命中的 Key。"""
+        keys  = list(dict.fromkeys(keys))
+        found = {k: v for k in keys if (v := self.lru.get(k)) is not None}
+
+        if self.redis and (missed := [k for k in keys if k not in found]):
+            try:
+                for k, raw in zip(missed, await self.redis.mget_bytes(missed)):
+                    if raw is not None:
+                        self.lru.set(k, value := self.loads(raw))
+                        found[k] = value
+            except Exception as e:
+                logger.warning(f"🟠 Redis {self.name} cache unavailable: {e}")
+
+        return found
+
+    async def set_many(self, mapping: dict[str, typing.Any]) -> None:
+        """批量写入两级缓存。"""
+        for k, value in mapping.items():
+            self.lru.set(k, value)
+
+        if self.redis and mapping:
+            try:
+                await self.redis.mset_bytes(
+                    {k: self.dumps(value) for k, value in mapping.items()}, ttl=self.ttl
+                )
+            except Exception as e:
+                logger.warning(f"🟠 Redis {self.name} cache unavailable: {e}")
+
+    async def fetch(
+        self,
+        keys: list[str],
+        compute: typing.Callable[[list[str]], typing.Awaitable[typing.Iterable[typing.Any]]]
+    ) -> list[typing.Any]:
+        """
+        按 keys 顺序返回值，只对未命中的 Key（去重后）调用 compute 并写回缓存。
+        """
+
+        found  = await self.get_many(keys)
+        missed = [k for k in dict.fromkeys(keys) if k not in found]
+        logger.info(
+            f"   └ {self.name} cache | hit={len(found)} | miss={len(missed)} | lru={len(self.lru)}"
+        )
+
+        if missed:
+            fresh = dict(zip(missed, await compute(missed)))
+            await self.set_many(fresh)
+            found |= fresh
+
+        return [found[k] for k in keys]
+
+    def __len__(self) -> int:
+        return len(self.lru)
+
+
+if __name__ == '__main__':
+    pass
@@ -12,16 +12,22 @@ import numpy
 import typing
 import pathlib
 import difflib
+import collections
 from loguru import logger
 from collections import OrderedDict
+from concurrent.futures import (
+    Future, ThreadPoolExecutor
+)
 from services.sequential import (
-    const, toolbox
+    const, packer, toolbox
 )
 from services.sequential.video import (
     VideoFrame, VideoObject
 )
 from services.sequential.hook import BaseHook
-from services.sequential.cutter.cut_range import VideoCutRange
+from services.sequential.cutter.cut_range import (
+    VideoCutRange, VideoCutIndex
+)
 
 
 class SingleClassifierResult(object):
@@ -281,6 +287,31 @@ class ClassifierResult(object):
         with open(json_path, "w+", **kwargs) as f:
             f.write(self.dumps())
 
+    @classmethod
+    def from_segments(
+        cls,
+        video_path: str,
+        segments: list[dict[str, typing.Any]],
+        step: int = None
+    ) -> "ClassifierResult":
+
+        step = step or 1
+
+        data: list["SingleClassifierResult"] = []
+        for each in segments:
+            start_frame, end_frame = each["start_frame"], each["end_frame"]
+            start_ts, end_ts       = each["start_ts"], each["end_ts"]
+
+            # 段内只保留首尾时间戳，中间帧按帧号线性插值
+            span = max(end_frame - start_frame, 1)
+            for frame_id in range(start_frame, end_frame + 1, step):
+                timestamp = start_ts + (end_ts - start_ts) * (frame_id - start_frame) / span
+                data.append(
+                    SingleClassifierResult(video_path, frame_id, timestamp, each["stage"])
+                )
+
+        return cls(data)
+
     @classmethod
     def load(cls, from_file: str) -> "ClassifierResult":
         assert os.path.isfile(from_file), f"file {from_file} not existed"
@@ -314,6 +345,49 @@ class ClassifierResult(object):
     get_frame_length = get_offset
 
 
+class _FrameSlot(object):
+    """
+    classify 中按帧序等待输出的一帧。
+
+    Notes
+    -----
+    结果只会处于以下一种状态：
+    - 已确定：区间外的帧或推理完成后，result 直接保存 stage
+    - 待提交：帧已放入当前 batch，index 为它在 batch 中的下标
+    - 推理中：batch 已提交，future 完成后取 future.result()[index]
+    - 跟随：boost 模式下沿用区间首帧的结果，source 指向首帧的 slot
+    """
+
+    __slots__ = ("frame", "result", "index", "future", "source")
+
+    def __init__(
+        self,
+        frame: "VideoFrame",
+        result: typing.Optional[str] = None,
+        index: typing.Optional[int] = None,
+        source: typing.Optional["_FrameSlot"] = None
+    ):
+
+        self.frame: "VideoFrame"                   = frame
+        self.result: typing.Optional[str]          = result
+        self.index: typing.Optional[int]           = index
+        self.future: typing.Optional["Future"]     = None
+        self.source: typing.Optional["_FrameSlot"] = source
+
+    @property
+    def ready(self) -> bool:
+        if self.source is not None:
+            return self.source.ready
+        if self.result is not None:
+            return True
+        return self.future is not None and self.future.done()
+
+    def resolve(self) -> str:
+        if self.result is None:
+            self.result = self.source.resolve() if self.source else self.future.result()[self.index]
+        return self.result
+
+
 class BaseClassifier(object):
 
     def __init__(
@@ -349,6 +423,11 @@ class BaseClassifier(object):
         self._hook_list.append(new_hook)
         logger.debug(f"add hook: {new_hook.__class__.__name__}")
 
+    def remove_hook(self, old_hook: "BaseHook") -> None:
+        if old_hook in self._hook_list:
+            self._hook_list.remove(old_hook)
+            logger.debug(f"remove hook: {old_hook.__class__.__name__}")
+
     def load(self, data: typing.Union[str, list["VideoCutRange"], None], *args, **kwargs) -> None:
         if isinstance(data, str):
             return self.load_from_dir(data, *args, **kwargs)
@@ -394,11 +473,109 @@ class BaseClassifier(object):
     def _classify_frame(self, frame: "VideoFrame", *args, **kwargs) -> str:
         raise NotImplementedError
 
+    def _classify_batch(self, frames: list["VideoFrame"], *args, **kwargs) -> list[str]:
+        return [self._classify_frame(frame, *args, **kwargs) for frame in frames]
+
     def _apply_hook(self, frame: "VideoFrame", *args, **kwargs) -> "VideoFrame":
         for each_hook in self._hook_list:
             frame = each_hook.do(frame, *args, **kwargs)
         return frame
 
+    def _prepare_frame(self, frame: "VideoFrame", *args, **kwargs) -> "VideoFrame":
+        return self._apply_hook(frame, *args, **kwargs)
+
+    def _submit_batch(
+        self,
+        batch: list[typing.Union["VideoFrame", "Future"]],
+        executor: typing.Optional["ThreadPoolExecutor"] = None,
+        *args,
+        **kwargs,
+    ) -> "Future":
+
+        if executor is None:
+            future = Future()
+            future.set_result(self._classify_batch(batch, *args, **kwargs))
+            return future
+
+        # 推理线程等待本批预处理完成后整批推理
+        def _infer() -> list[str]:
+            return self._classify_batch(
+                [each.result() if isinstance(each, Future) else each for each in batch], *args, **kwargs
+            )
+
+        return executor.submit(_infer)
+
+    @staticmethod
+    def _take_ready(pending: list["_FrameSlot"], at_least: int = None) -> list["_FrameSlot"]:
+        ready = 0
+        for slot in pending:
+            if not slot.ready:
+                break
+            ready += 1
+
+        if ready == 0 or ready < (at_least or 1):
+            return []
+
+        taken = pending[:ready]
+        del pending[:ready]
+
+        for slot in taken:
+            slot.resolve()
+            logger.debug(
+                f"frame {slot.frame.frame_id} ({slot.frame.timestamp}) belongs to {slot.result}"
+            )
+        return taken
+
+    @staticmethod
+    def _dump_pending(
+        video: "VideoObject",
+        pending: list["_FrameSlot"],
+        keep_data: bool = None,
+        stream_format: str = None,
+        segment: dict = None,
+    ) -> typing.Generator[typing.Union[str, bytes], None, None]:
+
+        for slot in pending:
+            logger.info(
+                f"Frame: {slot.frame.frame_id:05} - {slot.frame.timestamp:.5f} => {slot.result}"
+            )
+
+        if stream_format == const.STREAM_PACKED:
+            yield packer.pack_frames(
+                [(slot.frame.frame_id, slot.frame.timestamp, slot.result) for slot in pending]
+            )
+
+        elif stream_format == const.STREAM_SEGMENT:
+            # 同一 stage 的连续帧合并为一段，段结束时立即输出
+            for frame, result in ((slot.frame, slot.result) for slot in pending):
+                if segment and segment["stage"] == result:
+                    segment["end_frame"] = frame.frame_id
+                    segment["end_ts"]    = frame.timestamp
+                    continue
+
+                if segment:
+                    yield packer.dump_message("StageSegment", segment)
+                segment.update({
+                    "stage"       : result,
+                    "start_frame" : frame.frame_id,
+                    "end_frame"   : frame.frame_id,
+                    "start_ts"    : frame.timestamp,
+                    "end_ts"      : frame.timestamp,
+                })
+
+        else:
+            for frame, result in ((slot.frame, slot.result) for slot in pending):
+                single = {
+                    "video_path" : video.path,
+                    "frame_id"   : frame.frame_id,
+                    "timestamp"  : frame.timestamp,
+                    "result"     : result,
+                    "frame_data" : frame.data if keep_data else None,
+                }
+                yield packer.dump_message("SingleClassifierResult", single)
+
+        pending.clear()
+
     def classify(
         self,
         video: "VideoObject",
@@ -406,66 +583,132 @@ class BaseClassifier(object):
         step: int = None,
         keep_data: bool = None,
         boost_mode: bool = None,
+        batch_size: int = None,
+        stream_format: str = None,
+        workers: int = None,
         *args,
         **kwargs,
-    ) -> typing.Generator[str, None, None]:
+    ) -> typing.Generator[typing.Union[str, bytes], None, None]:
 
         logger.debug(f"classify with {self.__class__.__name__}")
-        step       = step or 1
-        boost_mode = boost_mode or True
+        step          = step or 1
+        boost_mode    = boost_mode or True
+        batch_size    = batch_size or 1
+        stream_format = stream_format or const.STREAM_SSE
 
         logger.info(f"========== Classify Begin ==========")
+        logger.info(
+            f"Classify batch size: {batch_size} stream format: {stream_format} workers: {workers or 0}"
+        )
+
+        # workers > 0 时 hook 与预处理进线程池，推理独占一个线程，与主线程取帧重叠执行
+        prep_pool  = ThreadPoolExecutor(workers, thread_name_prefix="prep") if workers else None
+        infer_pool = ThreadPoolExecutor(1, thread_name_prefix="infer") if workers else None
+
+        operator: typing.Optional["_BaseFrameOperator"] = None
         try:
             assert bool(boost_mode) == bool(valid_range), "boost_mode requires valid_range"
 
+            range_index = VideoCutIndex(valid_range) if valid_range else None
+
             operator = video.get_operator()
-            frame    = operator.get_frame_by_id(1)
-
-            prev_result: typing.Optional[str] = None
-            while frame is not None:
-                frame = self._apply_hook(frame, *args, **kwargs)
-                if valid_range and not any(
-                        [each.contain(frame.frame_id) for each in valid_range]
-                ):
-                    logger.debug(
-                        f"frame {frame.frame_id} ({frame.timestamp}) not in target range, skip"
-                    )
-                    result      = const.IGNORE_FLAG
-                    prev_result = None
+            length   = operator.get_length()
+            frame_id = 1
+
+            # 按帧序缓存待输出结果，只输出前缀中已完成推理的部分
+            pending: list["_FrameSlot"] = []
+            batch: list[typing.Union["VideoFrame", "Future"]] = []
+            batch_slots: list["_FrameSlot"] = []
+            inflight: collections.deque["Future"] = collections.deque()
+            segment: dict = {}
+
+            at_least = const.PACK_SIZE if stream_format == const.STREAM_PACKED else 1
+
+            def submit() -> None:
+                future = self._submit_batch(list(batch), infer_pool, *args, **kwargs)
+                for slot in batch_slots:
+                    slot.future = future
+                inflight.append(future)
+                batch.clear()
+                batch_slots.clear()
+
+            # boost 模式下当前区间首帧的 slot，后续帧沿用其结果
+            head: typing.Optional["_FrameSlot"] = None
+            while frame_id <= length:
+                if range_index and not range_index.contain(frame_id):
+                    # 区间外的整段帧只取时间戳，不读取像素也不经过 hook
+                    skip_end = min(range_index.next_start(frame_id) or length + 1, length + 1)
+                    while frame_id < skip_end:
+                        if (timestamp := operator.get_timestamp_by_id(frame_id)) is None:
+                            frame_id = length + 1
+                            break
+                        logger.debug(
+                            f"frame {frame_id} ({timestamp}) not in target range, skip"
+                        )
+                        pending.append(
+                            _FrameSlot(VideoFrame(frame_id, timestamp, None), result=const.IGNORE_FLAG)
+                        )
+                        frame_id += step
+                    head = None
+
+                elif boost_mode and head is not None and not keep_data:
+                    # 沿用区间首帧结果的帧同样无需读取像素
+                    if (timestamp := operator.get_timestamp_by_id(frame_id)) is None:
+                        break
+                    pending.append(_FrameSlot(VideoFrame(frame_id, timestamp, None), source=head))
+                    frame_id += step
+
                 else:
-                    if boost_mode and (prev_result is not None):
-                        result = prev_result
+                    if (frame := operator.get_frame_by_id(frame_id)) is None:
+                        break
+                    if boost_mode and head is not None:
+                        pending.append(_FrameSlot(self._apply_hook(frame, *args, **kwargs), source=head))
                     else:
-                        prev_result = result = self._classify_frame(frame, *args, **kwargs)
-                    logger.debug(
-                        f"frame {frame.frame_id} ({frame.timestamp}) belongs to {result}"
-                    )
-
-                single = {
-                    "video_path" : video.path,
-                    "frame_id"   : frame.frame_id,
-                    "timestamp"  : frame.timestamp,
-                    "result"     : result,
-                    "frame_data" : frame.data if keep_data else None,
-                }
-
-                stream = f"SingleClassifierResult: {json.dumps(single, ensure_ascii=False)}"
-                logger.info(
-                    f"Frame: {frame.frame_id:05} - {frame.timestamp:.5f} => {result}"
-                )
-                yield f"{stream}\n\n"
-
-                frame = operator.get_frame_by_id(frame.frame_id + step)
+                        batch.append(
+                            prep_pool.submit(self._prepare_frame, frame, *args, **kwargs)
+                            if prep_pool else self._prepare_frame(frame, *args, **kwargs)
+                        )
+                        head = _FrameSlot(frame, index=len(batch) - 1)
+                        batch_slots.append(head)
+                        pending.append(head)
+                    frame_id += step
+
+                # batch 未满但积压帧过多时也提前推理，避免输出被长时间阻塞
+                if batch and (len(batch) >= batch_size or len(pending) >= const.PACK_SIZE):
+                    submit()
+
+                # 在途 batch 超过上限时等待最早的一批，限制内存占用
+                while inflight and (inflight[0].done() or len(inflight) > const.INFLIGHT_LIMIT):
+                    inflight.popleft().result()
+
+                # packed 模式攒够 PACK_SIZE 帧再输出一个数据块
+                if ready := self._take_ready(pending, at_least):
+                    yield from self._dump_pending(video, ready, keep_data, stream_format, segment)
+
+            if batch:
+                submit()
+            while inflight:
+                inflight.popleft().result()
+
+            if ready := self._take_ready(pending):
+                yield from self._dump_pending(video, ready, keep_data, stream_format, segment)
+            if segment:
+                yield packer.dump_message("StageSegment", segment)
 
         except AssertionError as e:
             logger.error(e)
-            yield f"ERROR: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+            yield packer.dump_message("ERROR", {"error": str(e)}, stream_format)
 
         except Exception as e:
             logger.error(e)
-            yield f"FATAL: {json.dumps({'fatal': str(e)}, ensure_ascii=False)}\n\n"
+            yield packer.dump_message("FATAL", {"fatal": str(e)}, stream_format)
 
         finally:
+            for pool in (prep_pool, infer_pool):
+                if pool is not None:
+                    pool.shutdown(wait=True, cancel_futures=True)
+            if operator is not None:
+                operator.close()
             logger.info(f"========== Classify Final ==========")
 
 
@@ -489,6 +732,9 @@ class BaseModelClassifier(BaseClassifier):
     def predict_with_object(self, frame: "numpy.ndarray") -> str:
         raise NotImplementedError
 
+    def predict_with_batch(self, frames: list["numpy.ndarray"]) -> list[str]:
+        raise NotImplementedError
+
     def read_from_list(self, data: list[int], video_cap: "cv2.VideoCapture" = None, *_, **__):
         raise ValueError("model-like classifier only support loading data from files")
 
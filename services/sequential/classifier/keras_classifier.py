@@ -35,13 +35,19 @@ class KerasStruct(BaseModelClassifier):
 
         # Model
         self.model: typing.Optional["keras.Sequential"] = None
+        # Batch Tensor
+        self.batch_tensor: typing.Optional["numpy.ndarray"] = None
+        # Compiled Inference
+        self.infer_fn: typing.Optional[typing.Callable] = None
         # Model Config
+        self.jit_compile: bool          = kwargs.get("jit_compile", False)
         self.score_threshold: float     = kwargs.get("score_threshold", 0.0)
         self.nb_train_samples: int      = kwargs.get("nb_train_samples", 64)
         self.nb_validation_samples: int = kwargs.get("nb_validation_samples", 64)
         self.epochs: int                = kwargs.get("epochs", 20)
         self.batch_size: int            = kwargs.get("batch_size", 4)
 
+        logger.debug(f"jit compile: {self.jit_compile}")
         logger.debug(f"score threshold: {self.score_threshold}")
         logger.debug(f"nb train samples: {self.nb_train_samples}")
         logger.debug(f"nb validation samples: {self.nb_validation_samples}")
@@ -61,6 +67,29 @@ class KerasStruct(BaseModelClassifier):
         self.model = keras.models.load_model(model_path)
         logger.debug(f"Keras sequence model load data {self.model.input_shape}")
 
+        self.infer_fn = self.compile_infer()
+
+    def compile_infer(self) -> typing.Callable:
+        # 固定输入签名只 trace 一次，绕开 model.predict 每次调用重建数据适配器的开销
+        input_signature = [
+            tensorflow.TensorSpec(
+                shape=(None, *self.model.input_shape[1:]), dtype=tensorflow.float32
+            )
+        ]
+
+        @tensorflow.function(input_signature=input_signature, jit_compile=self.jit_compile)
+        def infer(tensor: "tensorflow.Tensor") -> "tensorflow.Tensor":
+            return self.model(tensor, training=False)
+
+        logger.debug(f"Keras sequence model compiled {input_signature[0]}")
+        return infer
+
+    def warm_up(self, batch_size: typing.Optional[int] = None) -> None:
+        batch_tensor = self._alloc_batch(batch_size or 1)
+        batch_tensor.fill(0)
+        self._predict_tensor(batch_tensor)
+        logger.debug(f"Keras sequence model warmed up {batch_tensor.shape}")
+
     def create_model(self, follow_tf_size: tuple, model_aisle: int) -> "keras.Sequential":
         logger.debug(f"Keras sequence model is being created")
 
@@ -177,11 +206,8 @@ class KerasStruct(BaseModelClassifier):
 
         return self.predict_with_object(fake_frame.data)
 
-    def predict_with_object(self, frame: "numpy.ndarray") -> str:
-        frame            = cv2.resize(frame, dsize=self.follow_cv_size)
-        frame            = numpy.expand_dims(frame, axis=[0, -1])
-        frame_result     = self.model.predict(frame, verbose=0)
-        frame_tag        = str(numpy.argmax(frame_result, axis=1)[0])
+    def _judge_result(self, frame_result: "numpy.ndarray") -> str:
+        frame_tag        = str(numpy.argmax(frame_result))
         frame_confidence = frame_result.max()
 
         if frame_confidence < self.score_threshold:
@@ -191,12 +217,56 @@ class KerasStruct(BaseModelClassifier):
             return const.UNKNOWN_STAGE_FLAG
         return frame_tag
 
+    def _alloc_batch(self, batch_size: int) -> "numpy.ndarray":
+        # 预分配输入张量，容量不足时才重新分配
+        if self.batch_tensor is None or len(self.batch_tensor) < batch_size:
+            self.batch_tensor = numpy.empty(
+                (batch_size, *self.model.input_shape[1:]), dtype=numpy.float32
+            )
+            logger.debug(f"Keras batch tensor allocated {self.batch_tensor.shape}")
+        return self.batch_tensor[:batch_size]
+
+    def _predict_tensor(self, tensor: "numpy.ndarray") -> "numpy.ndarray":
+        if self.infer_fn is None:
+            return self.model.predict(tensor, batch_size=len(tensor), verbose=0)
+        return self.infer_fn(tensor).numpy()
+
+    def predict_with_object(self, frame: "numpy.ndarray") -> str:
+        frame        = numpy.expand_dims(self.preprocess(frame), axis=0).astype(numpy.float32)
+        frame_result = self._predict_tensor(frame)
+
+        return self._judge_result(frame_result[0])
+
+    def preprocess(self, frame: "numpy.ndarray") -> "numpy.ndarray":
+        # 已是模型输入尺寸的帧（预处理线程已缩放）不再重复 resize
+        if frame.shape[:2] != self.follow_cv_size[::-1]:
+            frame = cv2.resize(frame, dsize=self.follow_cv_size)
+        return frame.reshape(self.model.input_shape[1:])
+
+    def predict_with_batch(self, frames: list["numpy.ndarray"]) -> list[str]:
+        batch_tensor = self._alloc_batch(len(frames))
+        for index, frame in enumerate(frames):
+            batch_tensor[index] = self.preprocess(frame)
+
+        batch_result = self._predict_tensor(batch_tensor)
+        return [self._judge_result(frame_result) for frame_result in batch_result]
+
+    def _prepare_frame(self, frame: "VideoFrame", *args, **kwargs) -> "VideoFrame":
+        frame = super()._prepare_frame(frame, *args, **kwargs)
+        return VideoFrame(frame.frame_id, frame.timestamp, self.preprocess(frame.data))
+
     def _classify_frame(self, frame: "VideoFrame", *_, **__) -> str:
         try:
             return self.predict_with_object(frame.data)
         except Exception as e:
             raise RuntimeError(f"帧预测失败: {type(e).__name__}")
 
+    def _classify_batch(self, frames: list["VideoFrame"], *_, **__) -> list[str]:
+        try:
+            return self.predict_with_batch([frame.data for frame in frames])
+        except Exception as e:
+            raise RuntimeError(f"批量帧预测失败: {type(e).__name__}")
+
 
 if __name__ == '__main__':
     pass
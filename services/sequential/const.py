@@ -11,6 +11,12 @@ UNSTABLE_FLAG      = r"-1"
 UNKNOWN_STAGE_FLAG = r"-2"
 IGNORE_FLAG        = r"-3"
 
+STREAM_SSE         = r"sse"
+STREAM_PACKED      = r"packed"
+STREAM_SEGMENT     = r"segment"
+PACK_SIZE          = 1024
+INFLIGHT_LIMIT     = 2
+
 
 if __name__ == '__main__':
     pass
@@ -7,6 +7,7 @@
 #
 
 import numpy
+import bisect
 import typing
 import random
 from loguru import logger
@@ -75,7 +76,7 @@ class VideoCutRange(object):
         )
 
     def contain(self, frame_id: int) -> bool:
-        return frame_id in range(self.start, self.end + 1)
+        return self.start <= frame_id <= self.end
 
     contain_frame_id = contain
 
@@ -186,5 +187,40 @@ class VideoCutRange(object):
     __repr__ = __str__
 
 
+class VideoCutIndex(object):
+
+    def __init__(self, cut_ranges: list["VideoCutRange"]):
+        # 重叠或相邻的区间合并后按起点排序，查询时二分定位
+        merged: list[list[int]] = []
+        for start, end in sorted((each.start, each.end) for each in cut_ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+
+        self.starts: list[int] = [start for start, _ in merged]
+        self.ends: list[int]   = [end for _, end in merged]
+
+        logger.debug(f"cut index built: {len(cut_ranges)} ranges -> {len(merged)} spans")
+
+    def contain(self, frame_id: int) -> bool:
+        index = bisect.bisect_right(self.starts, frame_id) - 1
+        return index >= 0 and frame_id <= self.ends[index]
+
+    contain_frame_id = contain
+
+    def next_start(self, frame_id: int) -> typing.Optional[int]:
+        index = bisect.bisect_right(self.starts, frame_id)
+        return self.starts[index] if index < len(self.starts) else None
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __str__(self):
+        return f"<VideoCutIndex spans={len(self)}>"
+
+    __repr__ = __str__
+
+
 if __name__ == '__main__':
     pass
@@ -15,6 +15,9 @@ from services.sequential.video import VideoFrame
 
 class BaseHook(object):
 
+    # 是否原地写入 frame.data，为 True 时只读帧会先复制一份再交给子类
+    inplace: bool = False
+
     def __init__(self, *_, **__):
         logger.debug(f"start initialing: {self.__class__.__name__} ...")
         self.result = dict()
@@ -25,6 +28,9 @@ class BaseHook(object):
         frame_id = frame.frame_id
         if frame_id != -1:
             logger.debug(f"{info}, frame id: {frame_id}")
+
+        if self.inplace and not frame.data.flags.writeable:
+            frame.data = frame.data.copy()
         return frame
 
 
@@ -135,6 +141,8 @@ class _AreaBaseHook(BaseHook):
 
 class CropHook(_AreaBaseHook):
 
+    inplace = True
+
     def do(self, frame: "VideoFrame", *_, **__) -> typing.Optional["VideoFrame"]:
         super().do(frame, *_, **__)
 
@@ -151,6 +159,8 @@ class CropHook(_AreaBaseHook):
 
 class OmitHook(_AreaBaseHook):
 
+    inplace = True
+
     def do(self, frame: "VideoFrame", *_, **__) -> typing.Optional["VideoFrame"]:
         super().do(frame, *_, **__)
 
@@ -166,6 +176,8 @@ class OmitHook(_AreaBaseHook):
 
 class PaintCropHook(_AreaBaseHook):
 
+    inplace = True
+
     def do(self, frame: "VideoFrame", *_, **__) -> typing.Optional["VideoFrame"]:
         super().do(frame, *_, **__)
 
@@ -182,6 +194,8 @@ class PaintCropHook(_AreaBaseHook):
 
 class PaintOmitHook(_AreaBaseHook):
 
+    inplace = True
+
     def do(self, frame: "VideoFrame", *_, **__) -> typing.Optional["VideoFrame"]:
         super().do(frame, *_, **__)
 
@@ -0,0 +1,54 @@
+#   ____            _
+#  |  _ \ __ _  ___| | _____ _ __
+#  | |_) / _` |/ __| |/ / _ \ '__|
+#  |  __/ (_| | (__|   <  __/ |
+#  |_|   \__,_|\___|_|\_\___|_|
+#
+
+import json
+import numpy
+import struct
+import typing
+from services.sequential import const
+
+# 每个数据块: 4 字节标签 + 4 字节负载长度（小端），随后为负载
+CHUNK_HEAD = struct.Struct("<4sI")
+
+CHUNK_TAGS: dict[str, bytes] = {
+    "SingleClassifierResult" : b"SCRB",
+    "StageSegment"           : b"SEGM",
+    "ERROR"                  : b"EROR",
+    "FATAL"                  : b"FATL",
+}
+
+# SCRB 负载为紧凑结构体数组
+FRAME_DTYPE = numpy.dtype(
+    [("frame_id", "<u4"), ("timestamp", "<f8"), ("stage", "<i2")]
+)
+
+
+def pack_chunk(tag: str, payload: bytes) -> bytes:
+    return CHUNK_HEAD.pack(CHUNK_TAGS[tag], len(payload)) + payload
+
+
+def pack_frames(frames: list[tuple[int, float, str]]) -> bytes:
+    records = numpy.array(
+        [(frame_id, timestamp, int(stage)) for frame_id, timestamp, stage in frames],
+        dtype=FRAME_DTYPE
+    )
+    return pack_chunk("SingleClassifierResult", records.tobytes())
+
+
+def dump_message(
+    tag: str,
+    message: dict[str, typing.Any],
+    stream_format: typing.Optional[str] = None
+) -> typing.Union[str, bytes]:
+
+    if stream_format == const.STREAM_PACKED:
+        return pack_chunk(tag, json.dumps(message, ensure_ascii=False).encode(const.CHARSET))
+    return f"{tag}: {json.dumps(message, ensure_ascii=False)}\n\n"
+
+
+if __name__ == '__main__':
+    pass
@@ -10,7 +10,10 @@ import cv2
 import math
 import time
 import random
+import struct
 import typing
+import zipfile
+import tempfile
 import contextlib
 import subprocess
 import numpy as np
@@ -242,6 +245,80 @@ def fps_convert(
     return subprocess.check_call(command)
 
 
+def frame_file_suffix(file_bytes: bytes) -> typing.Optional[str]:
+    if file_bytes.startswith(np.lib.format.MAGIC_PREFIX):
+        return ".npy"
+    if file_bytes[:4] in (b"PK\x03\x04", b"PK\x05\x06"):
+        return ".npz"
+    return None
+
+
+def dump_frame_file(file_bytes: bytes, suffix: typing.Optional[str] = None) -> str:
+    fd, frame_path = tempfile.mkstemp(suffix=suffix)
+    with os.fdopen(fd, "wb") as f:
+        f.write(file_bytes)
+
+    logger.debug(f"frame file dumped to {frame_path}")
+    return frame_path
+
+
+def is_frame_file(frame_path: str) -> bool:
+    if zipfile.is_zipfile(frame_path):
+        return True
+
+    with open(frame_path, "rb") as f:
+        return f.read(len(np.lib.format.MAGIC_PREFIX)) == np.lib.format.MAGIC_PREFIX
+
+
+def _read_npy_header(f: typing.BinaryIO) -> tuple[tuple[int, ...], bool, "np.dtype"]:
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+    return np.lib.format.read_array_header_2_0(f)
+
+
+def load_frame_file(frame_path: str) -> list["np.ndarray"]:
+    """
+    以内存映射方式读取帧文件，返回的每一帧都是同一块映射上的视图。
+
+    支持两种格式：
+    - 单个 .npy，形状为 (N, H, W) 或 (N, H, W, C)
+    - .npz，每个成员一帧；未压缩成员直接映射，压缩成员回退为读取
+    映射使用 copy-on-write 模式，hook 写入帧数据不会改动文件本身。
+    """
+
+    if not zipfile.is_zipfile(frame_path):
+        return list(np.load(frame_path, mmap_mode="c", allow_pickle=False))
+
+    mapped = np.memmap(frame_path, dtype=np.uint8, mode="c")
+
+    frame_arrays = []
+    with zipfile.ZipFile(frame_path) as zf, open(frame_path, "rb") as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                with zf.open(info) as member:
+                    frame_arrays.append(np.lib.format.read_array(member, allow_pickle=False))
+                continue
+
+            # local file header 固定 30 字节，末尾 4 字节为文件名与扩展字段长度
+            f.seek(info.header_offset)
+            name_len, extra_len = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+
+            shape, fortran_order, dtype = _read_npy_header(f)
+            offset = f.tell()
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+
+            frame_arrays.append(
+                mapped[offset: offset + nbytes].view(dtype).reshape(
+                    shape, order="F" if fortran_order else "C"
+                )
+            )
+
+    logger.debug(f"frame file mapped {len(frame_arrays)} frames from {frame_path}")
+    return frame_arrays
+
+
 def match_template_with_object(
     template: "np.ndarray",
     target: "np.ndarray",
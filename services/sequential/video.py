@@ -5,6 +5,7 @@
 #     \_/  |_|\__,_|\___|\___/
 #
 
+import cv2
 import numpy
 import typing
 from loguru import logger
@@ -28,7 +29,12 @@ class VideoFrame(object):
         return f"<VideoFrame id={self.frame_id} timestamp={self.timestamp}>"
 
     def copy(self) -> "VideoFrame":
-        return VideoFrame(self.frame_id, self.timestamp, self.data[:])
+        return VideoFrame(self.frame_id, self.timestamp, self.data.copy())
+
+    def view(self) -> "VideoFrame":
+        data = self.data.view()
+        data.flags.writeable = False
+        return VideoFrame(self.frame_id, self.timestamp, data)
 
     def contain_image(
         self,
@@ -63,9 +69,16 @@ class _BaseFrameOperator(object):
     def get_frame_by_id(self, frame_id: int) -> typing.Optional["VideoFrame"]:
         raise NotImplementedError
 
+    def get_timestamp_by_id(self, frame_id: int) -> typing.Optional[float]:
+        frame = self.get_frame_by_id(frame_id)
+        return frame.timestamp if frame else None
+
     def get_length(self) -> int:
         return self.video.frame_count
 
+    def close(self) -> None:
+        pass
+
 
 class MemFrameOperator(_BaseFrameOperator):
 
@@ -75,11 +88,84 @@ class MemFrameOperator(_BaseFrameOperator):
 
         frame_id = frame_id - 1
 
-        return self.video.frames_data[frame_id].copy()
+        # 只读视图，写入帧数据的 hook 会在 BaseHook.do 中自行复制
+        return self.video.frames_data[frame_id].view()
+
+    def get_timestamp_by_id(self, frame_id: int) -> typing.Optional[float]:
+        if frame_id > self.get_length():
+            return None
+
+        return self.video.frames_data[frame_id - 1].timestamp
 
 
 class DocFrameOperator(_BaseFrameOperator):
-    pass
+
+    # 前向跳帧不超过该值时逐帧 grab，超过才 seek
+    SEEK_THRESHOLD: int = 24
+
+    def __init__(
+        self,
+        video: "VideoObject"
+    ):
+
+        super().__init__(video)
+        self.video_cap: typing.Optional["cv2.VideoCapture"] = None
+
+    def _open(self) -> "cv2.VideoCapture":
+        if self.video_cap is None:
+            self.video_cap = cv2.VideoCapture(self.video.source)
+            self.cur_ptr   = 0
+            logger.debug(f"video capture opened: {self.video.source}")
+        return self.video_cap
+
+    def get_length(self) -> int:
+        return self.video.frame_count or toolbox.get_frame_count(self._open())
+
+    def _locate(self, frame_id: int) -> "cv2.VideoCapture":
+        video_cap = self._open()
+
+        # 顺序访问直接取下一帧，回退或远距离跳帧才 seek
+        if frame_id <= self.cur_ptr or frame_id - self.cur_ptr > self.SEEK_THRESHOLD:
+            video_cap.set(cv2.CAP_PROP_POS_FRAMES, frame_id - 1)
+        else:
+            for _ in range(frame_id - self.cur_ptr - 1):
+                video_cap.grab()
+        return video_cap
+
+    def get_frame_by_id(self, frame_id: int) -> typing.Optional["VideoFrame"]:
+        if frame_id < 1 or frame_id > self.get_length():
+            return None
+
+        video_cap = self._locate(frame_id)
+
+        ret, data = video_cap.read()
+        if not ret:
+            logger.warning(f"read frame failed, frame id: {frame_id}")
+            return None
+
+        self.cur_ptr = frame_id
+        return VideoFrame(frame_id, toolbox.get_current_frame_time(video_cap), data)
+
+    def get_timestamp_by_id(self, frame_id: int) -> typing.Optional[float]:
+        if frame_id < 1 or frame_id > self.get_length():
+            return None
+
+        # grab 只推进解码位置，不做像素转换
+        video_cap = self._locate(frame_id)
+        if not video_cap.grab():
+            logger.warning(f"grab frame failed, frame id: {frame_id}")
+            return None
+
+        self.cur_ptr = frame_id
+        return toolbox.get_current_frame_time(video_cap)
+
+    def close(self) -> None:
+        if self.video_cap is not None:
+            self.video_cap.release()
+            self.video_cap = None
+
+    def __del__(self):
+        self.close()
 
 
 class VideoObject(object):
@@ -89,13 +175,16 @@ class VideoObject(object):
         name: str,
         path: str,
         frame_count: int,
-        frames_data: typing.Optional[tuple["VideoFrame", ...]]
+        frames_data: typing.Optional[tuple["VideoFrame", ...]],
+        source: typing.Optional[str] = None
     ):
 
         self.name = name
         self.path = path
         self.frame_count = frame_count
         self.frames_data = frames_data
+        # 实际解码的文件，默认即 path；上传场景下 path 保留客户端原始路径用于结果输出
+        self.source = source or path
 
     def __str__(self):
         return f"<VideoObject name={self.name} path={self.path}>"
@@ -106,10 +195,15 @@ class VideoObject(object):
         self.frames_data = tuple()
 
     def frame_detail(self) -> tuple[str, tuple[int, ...]]:
-        frame = self.frames_data[0]
+        if self.frames_data:
+            frame = self.frames_data[0]
+        else:
+            operator = self.get_operator()
+            frame    = operator.get_frame_by_id(1)
+            operator.close()
 
         every_cost = frame.data.nbytes / (1024 ** 2)
-        total_cost = every_cost * len(self.frames_data)
+        total_cost = every_cost * (len(self.frames_data) if self.frames_data else self.frame_count)
         frame_size = frame.data.shape[::-1]
         frame_name = frame.__class__.__name__
         frame_info = f"[{every_cost:.2f} MB] [{total_cost:.2f} MB]"
@@ -118,7 +212,13 @@ class VideoObject(object):
         return frame_view, frame_size
 
     def _read_from_doc(self) -> typing.Generator["VideoFrame", None, None]:
-        pass
+        with toolbox.video_capture(self.source) as cap:
+            success, data = cap.read()
+            while success:
+                yield VideoFrame(
+                    toolbox.get_current_frame_id(cap), toolbox.get_current_frame_time(cap), data
+                )
+                success, data = cap.read()
 
     def _read_from_mem(self) -> typing.Generator["VideoFrame", None, None]:
         for each_frame in self.frames_data:
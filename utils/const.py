@@ -88,6 +88,57 @@ AUTH_KEY = r"X-Token"
 GROUP_MAIN = r"apps"
 GROUP_FUNC = r"functions"
 
+# ==== Notes: Embedding 微批合并 ====
+EMBED_MAX_INPUTS = 32
+EMBED_MAX_WAIT   = 0.005
+EMBED_MAX_TOKENS = 8192
+
+# ==== Notes: Rerank 并发 ====
+RERANK_MAX_INPUTS = 16
+RERANK_WORKERS    = 1
+
+# ==== Notes: 按 token 长度分桶 ====
+EMBED_TOKEN_BUDGET  = 16384
+EMBED_MAX_BATCH     = 128
+RERANK_TOKEN_BUDGET = 8192
+RERANK_MAX_BATCH    = 128
+
+# ==== Notes: Embedding 推理精度 ====
+PRECISION_FP32 = r"fp32"
+PRECISION_FP16 = r"fp16"
+PRECISION_BF16 = r"bf16"
+PRECISION_INT8 = r"int8"
+PRECISION_ONNX = r"onnx"
+PRECISION_GPU  = [PRECISION_FP32, PRECISION_FP16, PRECISION_BF16]
+PRECISION_CPU  = [PRECISION_INT8, PRECISION_ONNX]
+
+# ==== Notes: Embedding 向量输出格式 ====
+VEC_JSON   = r"json"
+VEC_BASE64 = r"base64"
+VEC_NPY    = r"npy"
+
+# ==== Notes: Embedding 向量缓存 ====
+EMBED_CACHE_SIZE = 50000
+EMBED_CACHE_TTL  = 7 * 24 * 3600
+
+# ==== Notes: Rerank 打分缓存 ====
+RERANK_CACHE_SIZE = 100000
+RERANK_CACHE_TTL  = 24 * 3600
+
+# ==== Notes: Yolo 批量检测 ====
+YOLO_DECODE_WORKERS = 4
+YOLO_IMGSZ          = 640
+YOLO_RAW            = r"raw"
+YOLO_RAW_HEAD       = r"<III"
+
+# ==== Notes: Yolo 检测结果缓存 ====
+YOLO_CACHE_OFF   = r"off"
+YOLO_CACHE_EXACT = r"exact"
+YOLO_CACHE_PHASH = r"phash"
+YOLO_CACHE_SIZE  = 10000
+YOLO_CACHE_TTL   = 3600
+YOLO_HASH_SIZE   = 16
+
 # ==== Notes: 过滤 ====
 IGNORE = [
     "*venv",
@@ -147,7 +198,9 @@ EMBEDDING_DEPENDENCIES = [
     "threadpoolctl==3.6.0",
     "scikit-learn==1.4.2 ",
     "Pillow==9.5.0",
-    "accelerate==1.12.0"
+    "accelerate==1.12.0",
+    "optimum==1.27.0",
+    "onnxruntime==1.20.1"
 ]
 
 # ==== Notes: inference 依赖 ====